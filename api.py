@@ -1,12 +1,14 @@
-import requests
 import time
 
-# USDA FoodData Central API endpoint and API key
-API_KEY = "39Kk8zLuBp9PeopykEEke0kd2QEie5WFVc8a1uOS"
-API_URL = "https://api.nal.usda.gov/fdc/v1/foods/search"
+from fdc_client import CLIENT, AuthenticationError, CircuitOpenError, DeadlineExceeded, FoodDataError
 
-def fetch_api_data(categories, notifications):
+# Upper bound (seconds) on the time spent fetching the initial database
+FETCH_BUDGET_SECONDS = 30
+
+def fetch_api_data(categories, notifications, budget_seconds=FETCH_BUDGET_SECONDS, client=CLIENT):
     initial_data = []
+    deadline = time.monotonic() + budget_seconds
+    api_available = True
     
     # Define search terms for each category
     search_terms = {
@@ -23,52 +25,46 @@ def fetch_api_data(categories, notifications):
         
         # Try multiple search terms to get variety
         for search_query in search_queries:
-            if len(category_foods) >= 10:  # Limit to 10 items per category
+            if len(category_foods) >= 10 or not api_available:  # Limit to 10 items per category
                 break
-                
-            params = {
-                "api_key": API_KEY,
-                "query": search_query,
-                "pageSize": 5,  # Smaller page size for faster response
-                "sortBy": "dataType.keyword",
-                "sortOrder": "asc"
-            }
             
             try:
                 print(f"Fetching data for {category} with query: {search_query}")
-                response = requests.get(API_URL, params=params, timeout=10)
+                foods = client.search_foods(
+                    search_query,
+                    page_size=5,  # Smaller page size for faster response
+                    deadline=deadline,
+                    sortBy="dataType.keyword",
+                    sortOrder="asc",
+                )
                 
-                if response.status_code == 200:
-                    data = response.json()
-                    foods = data.get("foods", [])
-                    
-                    if foods:
-                        print(f"Got {len(foods)} foods for {search_query}")
-                        for food in foods[:2]:  # Take only 2 items per search query
-                            if len(category_foods) >= 10:
-                                break
-                            food_name = food.get("description", "").strip()
-                            if food_name and food_name not in [item[0] for item in category_foods]:
-                                category_foods.append([food_name, category])
-                    else:
-                        print(f"No foods found for {search_query}")
-                        
-                elif response.status_code == 403:
-                    print(f"API key issue: {response.status_code}")
-                    notifications.append(f"API authentication failed for {category}")
-                    break
+                if foods:
+                    print(f"Got {len(foods)} foods for {search_query}")
+                    for food in foods[:2]:  # Take only 2 items per search query
+                        if len(category_foods) >= 10:
+                            break
+                        food_name = str(food.get("description") or "").strip()
+                        if food_name and food_name not in [item[0] for item in category_foods]:
+                            category_foods.append([food_name, category])
                 else:
-                    print(f"API request failed with status code: {response.status_code}")
+                    print(f"No foods found for {search_query}")
                     
-            except requests.RequestException as e:
-                print(f"Request exception for {search_query}: {e}")
-                continue
-            except Exception as e:
-                print(f"Unexpected error for {search_query}: {e}")
+            except AuthenticationError as e:
+                print(f"API key issue: {e}")
+                notifications.append(f"API authentication failed for {category}")
+                break
+            except (CircuitOpenError, DeadlineExceeded) as e:
+                # The API is down or the time budget is spent: stop querying
+                print(f"Skipping remaining API queries: {e}")
+                api_available = False
+                break
+            except FoodDataError as e:
+                print(f"Request failed for {search_query}: {e}")
                 continue
             
             # Small delay to respect API rate limits
-            time.sleep(0.3)
+            if time.monotonic() + 0.3 < deadline:
+                time.sleep(0.3)
         
         # Add the foods we found for this category
         if category_foods:
@@ -0,0 +1,331 @@
+import argparse
+import csv
+import gzip
+import json
+import os
+import tempfile
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timedelta
+
+import pandas as pd
+
+from storage import (DATA_DIR, MEAL_LOG_COLUMNS, NOTIFICATION_COLUMNS, LocalStorage,
+                     format_log_date, fsync_dir, write_excel_atomic)
+
+ARCHIVE_AFTER_DAYS = 90
+MAX_NOTIFICATIONS = 200
+SUMMARY_COLUMNS = ["Month", "Category", "Meals", "Quantity"]
+
+
+def _size(path):
+    return os.path.getsize(path) if os.path.exists(path) else 0
+
+
+def _timed_load(path):
+    if not os.path.exists(path):
+        return 0.0
+    started = time.perf_counter()
+    pd.read_excel(path)
+    return time.perf_counter() - started
+
+
+# Collapse repeated notifications: keep only the newest of each (Type, Message)
+# and at most max_notifications overall. Returns the number of rows removed.
+def compact_notifications(storage, max_notifications=MAX_NOTIFICATIONS):
+    with storage.lock:
+        notifications = storage.read_notifications()
+        if notifications.empty:
+            return 0
+        compacted = notifications.sort_values("Timestamp", kind="stable")
+        compacted = compacted.drop_duplicates(subset=["Type", "Message"], keep="last")
+        if max_notifications:
+            compacted = compacted.tail(max_notifications)
+        removed = len(notifications) - len(compacted)
+        if removed:
+            write_excel_atomic(compacted[NOTIFICATION_COLUMNS], storage.notifications_file)
+        return removed
+
+
+# Per month and category totals of an archived partition
+def _summarize_partition(storage, month):
+    totals = {}
+    with gzip.open(storage.archive_partition(month), "rt", newline="", encoding="utf-8") as f:
+        for row in csv.DictReader(f):
+            if row.get("Date") == "Date":
+                continue
+            meals, quantity = totals.get(row["Category"], (0, 0.0))
+            try:
+                quantity += float(row["Quantity"])
+            except (TypeError, ValueError):
+                pass
+            totals[row["Category"]] = (meals + 1, quantity)
+    return [[month, category, meals, round(quantity, 3)] for category, (meals, quantity) in sorted(totals.items())]
+
+
+def _write_summary(storage, months):
+    summary_file = os.path.join(storage.archive_dir, "summary.csv")
+    rows = []
+    if os.path.exists(summary_file):
+        with open(summary_file, newline="", encoding="utf-8") as f:
+            rows = [[row[column] for column in SUMMARY_COLUMNS]
+                    for row in csv.DictReader(f) if row["Month"] not in months]
+    for month in months:
+        if os.path.exists(storage.archive_partition(month)):
+            rows.extend(_summarize_partition(storage, month))
+    rows.sort(key=lambda row: (row[0], row[1]))
+    tmp_path = summary_file + ".tmp"
+    with open(tmp_path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(SUMMARY_COLUMNS)
+        writer.writerows(rows)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, summary_file)
+    fsync_dir(storage.archive_dir)
+
+
+# Replace a partition with its first keep_bytes bytes (None: the partition did
+# not exist) plus rows as a new gzip member. The new file is fsync'd and
+# swapped in atomically, so a crash leaves either the old or the new partition.
+def _rewrite_partition(path, keep_bytes, rows=None):
+    directory = os.path.dirname(path)
+    if not keep_bytes and (rows is None or rows.empty):
+        if os.path.exists(path):
+            os.remove(path)
+            fsync_dir(directory)
+        return
+    fd, tmp_path = tempfile.mkstemp(suffix=".csv.gz", dir=directory)
+    try:
+        with os.fdopen(fd, "wb") as out:
+            if keep_bytes:
+                with open(path, "rb") as f:
+                    out.write(f.read(keep_bytes))
+            if rows is not None and not rows.empty:
+                # Readers skip the header repeated at the start of each member
+                with gzip.open(out, "wt", newline="", encoding="utf-8") as member:
+                    writer = csv.writer(member)
+                    if not keep_bytes:
+                        writer.writerow(MEAL_LOG_COLUMNS)
+                    writer.writerows(rows[MEAL_LOG_COLUMNS].itertuples(index=False, name=None))
+            out.flush()
+            os.fsync(out.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    fsync_dir(directory)
+
+
+# JSON-safe version of a DataFrame cell
+def _plain(value):
+    if pd.isna(value):
+        return None
+    return value.item() if hasattr(value, "item") else value
+
+
+# Identity of a meal log row, the same whether read from the journal or the xlsx
+def _row_key(row):
+    date, category, meal, quantity = row
+    category, meal, quantity = _plain(category), _plain(meal), _plain(quantity)
+    try:
+        quantity = float(quantity)
+    except (TypeError, ValueError):
+        pass
+    return (format_log_date(date), category, meal, quantity)
+
+
+def _pending_file(storage):
+    return os.path.join(storage.archive_dir, "pending.json")
+
+
+def _load_pending(storage):
+    path = _pending_file(storage)
+    if not os.path.exists(path):
+        return None
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _write_pending(storage, pending):
+    path = _pending_file(storage)
+    with open(path + ".tmp", "w", encoding="utf-8") as f:
+        json.dump(pending, f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(path + ".tmp", path)
+    fsync_dir(storage.archive_dir)
+
+
+def _clear_pending(storage):
+    os.remove(_pending_file(storage))
+    fsync_dir(storage.archive_dir)
+
+
+# Write the journaled rows to their partitions, each first cut back to its
+# journaled size so that finishing a move twice never duplicates rows
+def _write_partitions(storage, pending):
+    rows = pd.DataFrame(pending["rows"], columns=MEAL_LOG_COLUMNS)
+    row_months = rows["Date"].str[:7]
+    for month, keep_bytes in sorted(pending["months"].items()):
+        _rewrite_partition(storage.archive_partition(month), keep_bytes, rows[row_months == month])
+    _write_summary(storage, sorted(pending["months"]))
+
+
+# Put the partitions back the way they were before a move
+def _undo_partitions(storage, pending):
+    for month, keep_bytes in pending["months"].items():
+        _rewrite_partition(storage.archive_partition(month), keep_bytes)
+    _write_summary(storage, sorted(pending["months"]))
+
+
+# Take the journaled rows out of the hot meal log. Rows are matched by value,
+# each journaled row removing at most one, so running this again (after a
+# crash) removes nothing that has already gone.
+def _remove_archived_rows(storage, pending):
+    remaining = Counter(_row_key(row) for row in pending["rows"])
+    meal_log = storage.read_meal_log()
+    keep = []
+    for row in meal_log[MEAL_LOG_COLUMNS].itertuples(index=False, name=None):
+        key = _row_key(row)
+        keep.append(remaining[key] <= 0)
+        remaining[key] -= 1
+    if not all(keep):
+        write_excel_atomic(meal_log[keep][MEAL_LOG_COLUMNS], storage.meal_log_file)
+
+
+# Move meal log entries from months older than archive_after_days into gzip'd
+# monthly CSV partitions (data/archive/meal_log-YYYY-MM.csv.gz) and refresh
+# data/archive/summary.csv. Returns the number of rows archived.
+#
+# The move is journaled in data/archive/pending.json: the partitions are
+# written and fsync'd before the rows leave the hot file, and a run that
+# finds a journal left by a crashed run finishes that move first.
+def archive_meal_log(storage, archive_after_days=ARCHIVE_AFTER_DAYS, now=None):
+    # Whole months before the cutoff month are archived; rows for an already
+    # archived month that turn up later are added to its partition on a later run
+    cutoff = ((now or datetime.now()) - timedelta(days=archive_after_days)).replace(day=1)
+    cutoff = cutoff.strftime("%Y-%m-%d")
+    with storage.lock:
+        archived = 0
+        pending = _load_pending(storage)
+        if pending is not None:
+            _write_partitions(storage, pending)
+            _remove_archived_rows(storage, pending)
+            _clear_pending(storage)
+            archived += len(pending["rows"])
+
+        if not os.path.exists(storage.meal_log_file):
+            return archived
+        meal_log = storage.read_meal_log()
+        if meal_log.empty:
+            return archived
+        dates = meal_log["Date"].map(format_log_date)
+        old = (dates != "") & (dates < cutoff)
+        if not old.any():
+            return archived
+
+        os.makedirs(storage.archive_dir, exist_ok=True)
+        rows = meal_log[old].assign(Date=dates[old])[MEAL_LOG_COLUMNS]
+        months = sorted(rows["Date"].str[:7].unique())
+        partitions = {month: storage.archive_partition(month) for month in months}
+        pending = {
+            "months": {month: os.path.getsize(path) if os.path.exists(path) else None
+                       for month, path in partitions.items()},
+            "rows": [[_plain(value) for value in row] for row in rows.itertuples(index=False, name=None)],
+        }
+        _write_pending(storage, pending)
+        try:
+            _write_partitions(storage, pending)
+        except Exception:
+            # The hot file is untouched, so undo the partitions; if that
+            # fails too, the journal lets the next run finish the move
+            try:
+                _undo_partitions(storage, pending)
+                _clear_pending(storage)
+            except Exception:
+                pass
+            raise
+        _remove_archived_rows(storage, pending)
+        _clear_pending(storage)
+        return archived + len(rows)
+
+
+# Run all compaction steps and report what they saved
+def compact(storage, archive_after_days=ARCHIVE_AFTER_DAYS, max_notifications=MAX_NOTIFICATIONS):
+    started = time.perf_counter()
+    hot_files = [storage.meal_log_file, storage.notifications_file]
+    bytes_before = sum(_size(path) for path in hot_files)
+    load_before = sum(_timed_load(path) for path in hot_files)
+
+    notifications_removed = compact_notifications(storage, max_notifications)
+    rows_archived = archive_meal_log(storage, archive_after_days)
+
+    bytes_after = sum(_size(path) for path in hot_files)
+    load_after = sum(_timed_load(path) for path in hot_files)
+    return {
+        "notifications_removed": notifications_removed,
+        "meal_log_rows_archived": rows_archived,
+        "hot_bytes_before": bytes_before,
+        "hot_bytes_after": bytes_after,
+        "bytes_saved": bytes_before - bytes_after,
+        "load_seconds_before": round(load_before, 4),
+        "load_seconds_after": round(load_after, 4),
+        "load_seconds_saved": round(load_before - load_after, 4),
+        "duration_seconds": round(time.perf_counter() - started, 4),
+    }
+
+
+def format_result(result):
+    return (f"Compaction removed {result['notifications_removed']} notifications and archived "
+            f"{result['meal_log_rows_archived']} meal log rows; hot files "
+            f"{result['hot_bytes_before']} -> {result['hot_bytes_after']} bytes "
+            f"({result['bytes_saved']} saved), load time "
+            f"{result['load_seconds_before']:.3f}s -> {result['load_seconds_after']:.3f}s, "
+            f"took {result['duration_seconds']:.3f}s")
+
+
+# Run compaction every interval_seconds on a daemon thread
+def start_scheduler(storage, interval_seconds, on_result=print, **options):
+    stop = threading.Event()
+
+    def loop():
+        while not stop.wait(interval_seconds):
+            try:
+                on_result(format_result(compact(storage, **options)))
+            except Exception as e:
+                on_result(f"Compaction failed: {e}")
+
+    threading.Thread(target=loop, daemon=True, name="compaction").start()
+    return stop
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compact notifications and archive old meal log entries")
+    parser.add_argument("--data-dir", default=DATA_DIR)
+    parser.add_argument("--url", help="run on a storage service instead of local files")
+    parser.add_argument("--archive-after-days", type=int, default=ARCHIVE_AFTER_DAYS)
+    parser.add_argument("--max-notifications", type=int, default=MAX_NOTIFICATIONS)
+    parser.add_argument("--every", type=float, help="repeat every N seconds instead of running once")
+    args = parser.parse_args()
+    options = {"archive_after_days": args.archive_after_days, "max_notifications": args.max_notifications}
+
+    if args.url:
+        from storage_client import StorageClient
+        client = StorageClient(args.url)
+        run = lambda: client.compact(**options)
+    else:
+        storage = LocalStorage(args.data_dir)
+        run = lambda: compact(storage, **options)
+
+    while True:
+        print(format_result(run()))
+        if not args.every:
+            break
+        time.sleep(args.every)
+
+
+if __name__ == "__main__":
+    main()
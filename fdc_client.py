@@ -0,0 +1,211 @@
+import os
+import random
+import threading
+import time
+
+import requests
+
+# USDA FoodData Central API endpoint and API key
+API_KEY = os.environ.get("FDC_API_KEY", "39Kk8zLuBp9PeopykEEke0kd2QEie5WFVc8a1uOS")
+API_BASE_URL = os.environ.get("YOURLIFE_FDC_URL", "https://api.nal.usda.gov/fdc/v1")
+
+# Upper bounds (seconds) of the latency histogram buckets
+LATENCY_BUCKETS = [0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, float("inf")]
+
+# Status codes worth retrying; other 4xx responses will not improve on retry
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+
+
+class FoodDataError(Exception):
+    pass
+
+
+class AuthenticationError(FoodDataError):
+    pass
+
+
+class CircuitOpenError(FoodDataError):
+    pass
+
+
+class DeadlineExceeded(FoodDataError):
+    pass
+
+
+# Fails fast after failure_threshold consecutive failures; after reset_timeout
+# one trial request is let through (half-open) to probe whether the API is back.
+class CircuitBreaker:
+    def __init__(self, failure_threshold=3, reset_timeout=30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return "half_open"
+        return "open"
+
+    def allow(self):
+        with self._lock:
+            state = self.state
+            if state == "closed":
+                return True
+            if state == "half_open" and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self._trial_in_flight = False
+
+    # Give the half-open trial slot back when a request ends with no verdict
+    def release(self):
+        with self._lock:
+            self._trial_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self._trial_in_flight or self.failures >= self.failure_threshold:
+                self.opened_at = time.monotonic()
+            self._trial_in_flight = False
+
+
+# Request latency histogram and outcome counters for one endpoint
+class EndpointStats:
+    def __init__(self):
+        self.buckets = [0] * len(LATENCY_BUCKETS)
+        self.requests = 0
+        self.errors = {}
+        self.total_seconds = 0.0
+        self.max_seconds = 0.0
+
+    def observe(self, seconds, error=None):
+        self.requests += 1
+        self.total_seconds += seconds
+        self.max_seconds = max(self.max_seconds, seconds)
+        for i, bound in enumerate(LATENCY_BUCKETS):
+            if seconds <= bound:
+                self.buckets[i] += 1
+                break
+        if error:
+            self.errors[error] = self.errors.get(error, 0) + 1
+
+    def snapshot(self):
+        return {
+            "requests": self.requests,
+            "errors": dict(self.errors),
+            "error_count": sum(self.errors.values()),
+            "mean_seconds": round(self.total_seconds / self.requests, 4) if self.requests else 0.0,
+            "max_seconds": round(self.max_seconds, 4),
+            "latency_buckets": {("+Inf" if bound == float("inf") else f"{bound:g}"): count
+                                for bound, count in zip(LATENCY_BUCKETS, self.buckets)},
+        }
+
+
+# FoodData Central client with per-request deadlines, jittered exponential
+# backoff, a circuit breaker and per-endpoint latency/error metrics
+class FoodDataClient:
+    def __init__(self, api_key=API_KEY, base_url=API_BASE_URL, timeout=5.0, max_retries=2,
+                 backoff_base=0.25, backoff_max=2.0, breaker=None):
+        self.api_key = api_key
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.breaker = breaker or CircuitBreaker()
+        self.session = requests.Session()
+        self._stats = {}
+        self._stats_lock = threading.Lock()
+
+    def _observe(self, endpoint, seconds, error=None):
+        with self._stats_lock:
+            self._stats.setdefault(endpoint, EndpointStats()).observe(seconds, error)
+
+    def metrics(self):
+        with self._stats_lock:
+            endpoints = {endpoint: stats.snapshot() for endpoint, stats in self._stats.items()}
+        return {"circuit": self.breaker.state, "endpoints": endpoints}
+
+    # "Full jitter": a random delay up to the exponential bound
+    def _backoff(self, attempt):
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+
+    # GET an endpoint and return its JSON body. deadline is a time.monotonic()
+    # value after which no further attempt (or backoff sleep) is started.
+    def get(self, endpoint, params=None, deadline=None):
+        params = dict(params or {}, api_key=self.api_key)
+        last_error = None
+        for attempt in range(self.max_retries + 1):
+            # Check the deadline before taking a half-open trial slot
+            timeout = self.timeout
+            if deadline is not None:
+                timeout = min(timeout, deadline - time.monotonic())
+                if timeout <= 0:
+                    raise DeadlineExceeded(f"Deadline exceeded before requesting {endpoint}") from last_error
+            if not self.breaker.allow():
+                raise CircuitOpenError(f"FoodData Central circuit open, skipping {endpoint}")
+
+            started = time.monotonic()
+            try:
+                response = self.session.get(f"{self.base_url}/{endpoint}", params=params, timeout=timeout)
+            except requests.Timeout as e:
+                error, last_error = "timeout", e
+            except requests.RequestException as e:
+                error, last_error = "connection", e
+            except BaseException:
+                self.breaker.release()
+                raise
+            else:
+                if response.status_code == 200:
+                    try:
+                        data = response.json()
+                    except ValueError as e:
+                        self._observe(endpoint, time.monotonic() - started, "invalid_json")
+                        self.breaker.record_failure()
+                        raise FoodDataError(f"Invalid JSON from {endpoint}") from e
+                    self._observe(endpoint, time.monotonic() - started)
+                    self.breaker.record_success()
+                    return data
+                error = f"http_{response.status_code}"
+                last_error = FoodDataError(f"{endpoint} returned status code {response.status_code}")
+                if response.status_code in (401, 403):
+                    # The API is up, the key is not accepted
+                    self._observe(endpoint, time.monotonic() - started, error)
+                    self.breaker.record_success()
+                    raise AuthenticationError(f"API key rejected ({response.status_code})")
+                if response.status_code not in RETRY_STATUS_CODES:
+                    self._observe(endpoint, time.monotonic() - started, error)
+                    self.breaker.record_success()
+                    raise last_error
+
+            self._observe(endpoint, time.monotonic() - started, error)
+            self.breaker.record_failure()
+            if attempt < self.max_retries:
+                delay = self._backoff(attempt)
+                if deadline is not None and time.monotonic() + delay >= deadline:
+                    break
+                time.sleep(delay)
+        raise FoodDataError(f"{endpoint} failed after retries: {last_error}") from last_error
+
+    def search_foods(self, query, page_size=5, deadline=None, **params):
+        params.update({"query": query, "pageSize": page_size})
+        data = self.get("foods/search", params, deadline=deadline)
+        foods = data.get("foods", []) if isinstance(data, dict) else None
+        if not isinstance(foods, list):
+            raise FoodDataError(f"Unexpected response from foods/search: {type(data).__name__}")
+        return [food for food in foods if isinstance(food, dict)]
+
+
+# Shared by all sessions in this process, so the breaker and metrics see every call
+CLIENT = FoodDataClient()
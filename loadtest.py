@@ -0,0 +1,421 @@
+import argparse
+import json
+import multiprocessing
+import os
+import queue
+import random
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+APP_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "lol.py")
+ACTIONS = ["type", "save", "add", "edit", "delete"]
+DEFAULT_WEIGHTS = {"type": 5, "save": 3, "add": 1, "edit": 1, "delete": 1}
+
+
+# Local stand-in for the USDA FoodData Central search endpoint
+class StubFoodDataHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        if self.server.latency:
+            time.sleep(self.server.latency)
+        if random.random() < self.server.failure_rate:
+            status, body = 503, b""
+        else:
+            query = self.path.split("query=", 1)[-1].split("&", 1)[0]
+            foods = [{"description": f"{query.upper()} VARIANT {i + 1}"} for i in range(5)]
+            status, body = 200, json.dumps({"foods": foods}).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+def start_stub_api(latency=0.0, failure_rate=0.0):
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubFoodDataHandler)
+    server.daemon_threads = True
+    server.latency = latency
+    server.failure_rate = failure_rate
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+
+# Nearest-rank percentile
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, int(round(pct / 100.0 * len(ordered))) - 1))
+    return ordered[index]
+
+
+class SessionStats:
+    def __init__(self):
+        self.latencies = []
+        self.errors = 0
+        self.error_messages = {}
+        self.saves = 0
+        self.actions = {action: 0 for action in ACTIONS}
+        self.seconds = 0.0
+
+    def record(self, seconds, error=None):
+        self.latencies.append(seconds)
+        if error:
+            self.errors += 1
+            self.error_messages[error] = self.error_messages.get(error, 0) + 1
+
+    def merge(self, other):
+        self.latencies.extend(other.latencies)
+        self.errors += other.errors
+        for message, count in other.error_messages.items():
+            self.error_messages[message] = self.error_messages.get(message, 0) + count
+        self.saves += other.saves
+        for action, count in other.actions.items():
+            self.actions[action] += count
+        self.seconds = max(self.seconds, other.seconds)
+
+
+# One simulated browser session driving lol.py through AppTest
+class SimulatedSession:
+    def __init__(self, session_id, stats, rng, timeout):
+        from streamlit.testing.v1 import AppTest
+
+        self.id = session_id
+        self.stats = stats
+        self.rng = rng
+        self.at = AppTest.from_file(APP_FILE, default_timeout=timeout)
+        self.counter = 0
+
+    # Run one interaction (a rerun) and record its latency and errors
+    def _rerun(self, interaction=None):
+        started = time.perf_counter()
+        error = None
+        try:
+            if interaction is None:
+                self.at.run()
+            else:
+                interaction(self.at).run()
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"
+        elapsed = time.perf_counter() - started
+        if error is None and self.at.exception:
+            error = self.at.exception[0].message.splitlines()[0]
+        if error is None and self.at.error:
+            error = str(self.at.error[0].value).splitlines()[0]
+        self.stats.record(elapsed, error)
+        return error is None
+
+    def _unique_name(self, prefix):
+        self.counter += 1
+        return f"{prefix} {self.id}-{self.counter}"
+
+    def _meal_names(self):
+        from meal_index import MEALS
+        return list(MEALS.names())
+
+    def _button(self, key):
+        return lambda at: at.button(key=key).click()
+
+    def _has_button(self, key):
+        return any(button.key == key for button in self.at.button)
+
+    def start(self):
+        return self._rerun()
+
+    def type_meal(self):
+        names = self._meal_names()
+        if names and self.rng.random() < 0.7:
+            name = self.rng.choice(names)
+            text = name[:self.rng.randint(2, max(2, min(len(name), 6)))]
+        else:
+            text = self._unique_name("typed meal")
+        return self._rerun(lambda at: at.text_input(key="meal_input_field").set_value(text))
+
+    def save_meal(self):
+        names = self._meal_names()
+        meal = self.rng.choice(names) if names and self.rng.random() < 0.8 else self._unique_name("logged meal")
+        if not self._rerun(lambda at: at.text_input(key="meal_input_field").set_value(meal)):
+            return False
+        quantity = round(self.rng.uniform(0.5, 3.0), 1)
+        if not self._rerun(lambda at: at.number_input[0].set_value(quantity)):
+            return False
+        save_button = next((button for button in self.at.button if button.label.startswith("💾")), None)
+        if save_button is None:
+            self.stats.record(0.0, "Save button missing")
+            return False
+        ok = self._rerun(lambda at: save_button.click())
+        if ok and any("Meal saved" in str(success.value) for success in self.at.success):
+            self.stats.saves += 1
+        return ok
+
+    def add_meal(self):
+        meal = self._unique_name("new meal")
+        if not self._rerun(lambda at: at.text_input(key="meal_input_field").set_value(meal)):
+            return False
+        if not self._has_button("add_to_db_btn") or not self._rerun(self._button("add_to_db_btn")):
+            return False
+        return self._has_button("confirm_add") and self._rerun(self._button("confirm_add"))
+
+    def _row_button(self, prefix):
+        keys = [button.key for button in self.at.button if button.key and button.key.startswith(prefix)]
+        return self.rng.choice(keys) if keys else None
+
+    def edit_meal(self):
+        key = self._row_button("edit_")
+        if key is None or not self._rerun(self._button(key)):
+            return False
+        new_name = self._unique_name("edited meal")
+        if not self._has_button("confirm_edit"):
+            return False
+        if not self._rerun(lambda at: at.text_input(key="edit_meal_name").set_value(new_name)):
+            return False
+        return self._rerun(self._button("confirm_edit"))
+
+    def delete_meal(self):
+        key = self._row_button("delete_")
+        return key is not None and self._rerun(self._button(key))
+
+    def run_action(self, action):
+        self.stats.actions[action] += 1
+        return {"type": self.type_meal, "save": self.save_meal, "add": self.add_meal,
+                "edit": self.edit_meal, "delete": self.delete_meal}[action]()
+
+
+# Keep Streamlit's per-rerun warnings out of the report
+def _quiet_streamlit():
+    from streamlit import config, logger
+    config.set_option("logger.level", "error")
+    logger.set_log_level("error")
+
+
+# Entry point of a session process. AppTest swaps process-global runtime
+# state on every run, so each simulated session needs its own process.
+def _session_worker(session_id, actions_per_session, weights, seed, timeout, barrier, results):
+    _quiet_streamlit()
+    # The app's progress prints would drown out the report
+    sys.stdout = open(os.devnull, "w")
+    stats = SessionStats()
+    rng = random.Random(seed * 1000 + session_id)
+    action_names = list(weights)
+    action_weights = [weights[action] for action in action_names]
+    try:
+        session = SimulatedSession(session_id, stats, rng, timeout)
+    except Exception as e:
+        stats.record(0.0, f"session setup failed: {e}")
+        session = None
+    # Start all sessions together, after the (slow) imports are done
+    try:
+        barrier.wait(timeout=300)
+    except threading.BrokenBarrierError:
+        pass
+    if session is not None:
+        started = time.perf_counter()
+        session.start()
+        for _ in range(actions_per_session):
+            session.run_action(rng.choices(action_names, action_weights)[0])
+        stats.seconds = time.perf_counter() - started
+    results.put(stats)
+
+
+# One untimed first run of the app, so the data directory is initialized
+# (meal database from the API, notifications) before any level is measured
+def _warmup_worker(timeout, results):
+    _quiet_streamlit()
+    sys.stdout = open(os.devnull, "w")
+    stats = SessionStats()
+    try:
+        SimulatedSession("warmup", stats, random.Random(0), timeout).start()
+    except Exception as e:
+        stats.record(0.0, f"warm-up failed: {e}")
+    results.put(stats)
+
+
+def warm_up(timeout):
+    context = multiprocessing.get_context("spawn")
+    results = context.Queue()
+    process = context.Process(target=_warmup_worker, name="warmup", args=(timeout, results))
+    process.start()
+    try:
+        stats = results.get(timeout=timeout + 300)
+    except queue.Empty:
+        stats = SessionStats()
+        stats.record(0.0, "warm-up did not report back")
+    process.join(timeout=10)
+    if process.is_alive():
+        process.terminate()
+    return stats
+
+
+def _duplicate_names(storage):
+    rows, _ = storage.meal_rows()
+    names = [name for name, _ in rows]
+    return len(names) - len(set(names))
+
+
+# Check that the data files are readable and no logged meals were lost
+def check_integrity(storage, expected_log_rows, duplicates_before=0):
+    problems = []
+    try:
+        meal_log_rows = sum(1 for _ in storage.iter_meal_log())
+        if meal_log_rows != expected_log_rows:
+            problems.append(f"meal log has {meal_log_rows} rows, expected {expected_log_rows}")
+    except Exception as e:
+        problems.append(f"meal log unreadable: {e}")
+    try:
+        duplicates = _duplicate_names(storage)
+        if duplicates > duplicates_before:
+            problems.append(f"meal database gained {duplicates - duplicates_before} duplicate names")
+    except Exception as e:
+        problems.append(f"meal database unreadable: {e}")
+    try:
+        storage.read_notifications()
+    except Exception as e:
+        problems.append(f"notifications unreadable: {e}")
+    return problems
+
+
+def run_level(sessions, actions_per_session, weights, seed, timeout):
+    from storage import get_storage
+
+    storage = get_storage()
+    log_rows_before = sum(1 for _ in storage.iter_meal_log())
+    duplicates_before = _duplicate_names(storage)
+
+    # spawn, not fork: children must not inherit the parent's storage
+    # connections, and they pick up the YOURLIFE_* environment on import
+    context = multiprocessing.get_context("spawn")
+    barrier = context.Barrier(sessions)
+    results = context.Queue()
+    processes = [context.Process(target=_session_worker, name=f"session-{i}",
+                                 args=(i, actions_per_session, weights, seed, timeout, barrier, results))
+                 for i in range(sessions)]
+    for process in processes:
+        process.start()
+
+    stats = SessionStats()
+    for process in processes:
+        try:
+            stats.merge(results.get(timeout=timeout * (actions_per_session * 3 + 1) + 300))
+        except queue.Empty:
+            stats.record(0.0, "session did not report back")
+    for process in processes:
+        process.join(timeout=10)
+        if process.is_alive():
+            process.terminate()
+    elapsed = stats.seconds
+
+    problems = check_integrity(storage, log_rows_before + stats.saves, duplicates_before)
+    reruns = len(stats.latencies)
+    return {
+        "sessions": sessions,
+        "reruns": reruns,
+        "seconds": round(elapsed, 3),
+        "throughput_reruns_per_second": round(reruns / elapsed, 2) if elapsed else 0.0,
+        "p50_ms": round(percentile(stats.latencies, 50) * 1000, 1),
+        "p95_ms": round(percentile(stats.latencies, 95) * 1000, 1),
+        "p99_ms": round(percentile(stats.latencies, 99) * 1000, 1),
+        "errors": stats.errors,
+        "error_rate": round(stats.errors / reruns, 4) if reruns else 0.0,
+        "top_errors": sorted(stats.error_messages.items(), key=lambda item: -item[1])[:3],
+        "saves": stats.saves,
+        "actions": stats.actions,
+        "integrity_problems": problems,
+    }
+
+
+def format_row(result):
+    return (f"{result['sessions']:>8} {result['reruns']:>7} {result['throughput_reruns_per_second']:>9.2f} "
+            f"{result['p50_ms']:>8.1f} {result['p95_ms']:>8.1f} {result['p99_ms']:>8.1f} "
+            f"{result['error_rate']:>8.2%} {'OK' if not result['integrity_problems'] else 'CORRUPT':>9}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Drive lol.py headlessly with concurrent simulated sessions")
+    parser.add_argument("--sessions", default="1,2,4,8", help="comma-separated concurrent session counts")
+    parser.add_argument("--actions", type=int, default=10, help="actions per session at each level")
+    parser.add_argument("--mix", default=",".join(f"{k}={v}" for k, v in DEFAULT_WEIGHTS.items()),
+                        help="action weights, e.g. type=5,save=3,add=1,edit=1,delete=1")
+    parser.add_argument("--data-dir", help="copy this data directory as the starting state (default: empty)")
+    parser.add_argument("--storage", choices=["local", "service"], default="local",
+                        help="use local files or a storage service on localhost")
+    parser.add_argument("--api-latency", type=float, default=0.0, help="stub API latency in seconds")
+    parser.add_argument("--api-failure-rate", type=float, default=0.0, help="fraction of stub API calls that fail")
+    parser.add_argument("--timeout", type=float, default=60.0, help="per-rerun timeout in seconds")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--json", help="also write the results to this file")
+    parser.add_argument("--keep-data", action="store_true", help="do not delete the working data directory")
+    args = parser.parse_args()
+
+    weights = {}
+    for item in args.mix.split(","):
+        action, _, weight = item.partition("=")
+        if action not in ACTIONS:
+            parser.error(f"unknown action '{action}' in --mix")
+        weights[action] = float(weight or 1)
+
+    work_dir = tempfile.mkdtemp(prefix="yourlife-loadtest-")
+    data_dir = os.path.join(work_dir, "data")
+    if args.data_dir:
+        shutil.copytree(args.data_dir, data_dir)
+    else:
+        os.makedirs(data_dir)
+
+    # Configuration is read from the environment when the app modules are
+    # first imported, so it has to be in place before anything imports them
+    api_server, api_url = start_stub_api(args.api_latency, args.api_failure_rate)
+    os.environ["YOURLIFE_FDC_URL"] = api_url
+    os.environ["YOURLIFE_DATA_DIR"] = data_dir
+    service = None
+    if args.storage == "service":
+        import socket
+        with socket.socket() as sock:
+            sock.bind(("127.0.0.1", 0))
+            port = sock.getsockname()[1]
+        os.environ["YOURLIFE_STORAGE_URL"] = f"http://127.0.0.1:{port}"
+        import storage_service
+        from storage import LocalStorage
+        service, _ = storage_service.start_in_thread(LocalStorage(data_dir), port=port)
+    else:
+        os.environ.pop("YOURLIFE_STORAGE_URL", None)
+
+    results = []
+    print(f"Load test: {args.storage} storage, {args.actions} actions/session, data in {data_dir}")
+    print(f"{'sessions':>8} {'reruns':>7} {'reruns/s':>9} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} "
+          f"{'errors':>8} {'integrity':>9}")
+    try:
+        # The baseline of each level is taken after this, so first-run
+        # initialization is neither timed nor counted as corruption
+        warmup = warm_up(args.timeout)
+        for message, count in warmup.error_messages.items():
+            print(f"         ! warm-up: {count}x {message}")
+        for sessions in [int(count) for count in args.sessions.split(",") if count]:
+            result = run_level(sessions, args.actions, weights, args.seed, args.timeout)
+            results.append(result)
+            print(format_row(result))
+            for problem in result["integrity_problems"]:
+                print(f"         ! {problem}")
+            for message, count in result["top_errors"]:
+                print(f"         ! {count}x {message}")
+    finally:
+        api_server.shutdown()
+        if service:
+            service.shutdown()
+        if not args.keep_data:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+    summary = {"storage": args.storage, "actions_per_session": args.actions, "levels": results}
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(summary, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
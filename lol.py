@@ -1,19 +1,15 @@
 import streamlit as st
 import pandas as pd
-from datetime import datetime
-import os
+from datetime import datetime, timedelta
 import sys
 import api  # Import the api module
+import reports
+from meal_index import MEALS
 from difflib import SequenceMatcher
 
 # Page configuration
 st.set_page_config(page_title="YourLife Coach - Health Journey")
 
-# File paths for meal log, database, and notifications
-MEAL_LOG_FILE = "data/meal_log.xlsx"
-MEAL_DATABASE_FILE = "data/meal_database.xlsx"
-NOTIFICATIONS_FILE = "data/notifications.xlsx"
-
 # Check for required dependencies
 try:
     import openpyxl
@@ -21,6 +17,11 @@ except ImportError:
     st.error("The 'openpyxl' module is required to save Excel files. Please install it by running 'pip install openpyxl' in your terminal.")
     sys.exit(1)
 
+# Storage backend for meal log, database, and notifications
+# (local xlsx files, or the shared storage service if YOURLIFE_STORAGE_URL is set)
+from storage import get_storage
+STORAGE = get_storage()
+
 # Initialize session state variables
 if "show_add_popup" not in st.session_state:
     st.session_state.show_add_popup = False
@@ -36,6 +37,10 @@ if "show_suggestions" not in st.session_state:
     st.session_state.show_suggestions = False
 if "show_notifications" not in st.session_state:
     st.session_state.show_notifications = True
+if "database_checked" not in st.session_state:
+    st.session_state.database_checked = False
+if "report_job_id" not in st.session_state:
+    st.session_state.report_job_id = None
 
 # Custom CSS for better styling including proper popup overlay
 st.markdown("""
@@ -231,31 +236,17 @@ def find_fuzzy_matches(query, meal_list, threshold=0.4):
 
 # Function to load or create notifications
 def load_notifications():
-    if os.path.exists(NOTIFICATIONS_FILE):
-        try:
-            return pd.read_excel(NOTIFICATIONS_FILE)
-        except Exception as e:
-            st.warning(f"Error reading notifications: {e}")
-            # Create empty notifications file
-            df = pd.DataFrame(columns=["Timestamp", "Type", "Message"])
-            df.to_excel(NOTIFICATIONS_FILE, index=False)
-            return df
-    else:
-        # Create empty notifications file
-        os.makedirs(os.path.dirname(NOTIFICATIONS_FILE), exist_ok=True)
-        df = pd.DataFrame(columns=["Timestamp", "Type", "Message"])
-        df.to_excel(NOTIFICATIONS_FILE, index=False)
-        return df
+    try:
+        return STORAGE.read_notifications()
+    except Exception as e:
+        st.warning(f"Error reading notifications: {e}")
+        return pd.DataFrame(columns=["Timestamp", "Type", "Message"])
 
 # Function to add notification
 def add_notification(message, notification_type="info"):
     try:
-        notifications = load_notifications()
         timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        new_notification = pd.DataFrame([[timestamp, notification_type, message]], 
-                                      columns=["Timestamp", "Type", "Message"])
-        notifications = pd.concat([notifications, new_notification], ignore_index=True)
-        notifications.to_excel(NOTIFICATIONS_FILE, index=False)
+        STORAGE.add_notification(timestamp, notification_type, message)
         return True
     except Exception as e:
         st.error(f"Failed to add notification: {e}")
@@ -263,17 +254,17 @@ def add_notification(message, notification_type="info"):
 
 # Function to initialize database with API data
 def initialize_database_with_api():
-    # Create data directory if it doesn't exist
-    os.makedirs("data", exist_ok=True)
-    
     # Check if database file exists and has content
     database_needs_init = True
-    if os.path.exists(MEAL_DATABASE_FILE):
+    if STORAGE.meal_database_exists():
         try:
-            existing_df = pd.read_excel(MEAL_DATABASE_FILE)
-            if not existing_df.empty and len(existing_df) > 0:
+            MEALS.refresh(STORAGE)
+            if len(MEALS) > 0:
                 database_needs_init = False
-                add_notification(f"Database already exists with {len(existing_df)} items.", "info")
+                # Only once per session, not on every rerun
+                if not st.session_state.database_checked:
+                    st.session_state.database_checked = True
+                    add_notification(f"Database already exists with {len(MEALS)} items.", "info")
         except Exception as e:
             st.warning(f"Error reading existing database: {e}")
             database_needs_init = True
@@ -287,81 +278,59 @@ def initialize_database_with_api():
                 initial_data = api.fetch_api_data(categories, notifications)
                 
                 if initial_data:
-                    df = pd.DataFrame(initial_data, columns=["Meal", "Category"])
-                    df.to_excel(MEAL_DATABASE_FILE, index=False)
+                    STORAGE.write_meal_database(initial_data)
                     add_notification(f"Database initialized with {len(initial_data)} items from USDA API!", "success")
                 else:
                     add_notification("Failed to fetch data from API. Creating empty database.", "error")
-                    df = pd.DataFrame(columns=["Meal", "Category"])
-                    df.to_excel(MEAL_DATABASE_FILE, index=False)
+                    STORAGE.write_meal_database([])
                     
             except Exception as e:
                 add_notification(f"Error initializing database: {e}", "error")
                 # Create empty database as fallback
-                df = pd.DataFrame(columns=["Meal", "Category"])
-                df.to_excel(MEAL_DATABASE_FILE, index=False)
+                STORAGE.write_meal_database([])
         
         # Display notifications from API
         for msg in notifications:
             add_notification(msg, "success")
 
+        refresh_meal_index()
+
 # Function to load or create meal log
 def load_meal_log():
-    if os.path.exists(MEAL_LOG_FILE):
-        try:
-            return pd.read_excel(MEAL_LOG_FILE)
-        except Exception as e:
-            st.warning(f"Error reading meal log: {e}")
-            # Create empty meal log
-            df = pd.DataFrame(columns=["Date", "Category", "Meal", "Quantity"])
-            df.to_excel(MEAL_LOG_FILE, index=False)
-            return df
-    else:
-        # Create empty meal log file
-        os.makedirs(os.path.dirname(MEAL_LOG_FILE), exist_ok=True)
-        df = pd.DataFrame(columns=["Date", "Category", "Meal", "Quantity"])
-        df.to_excel(MEAL_LOG_FILE, index=False)
-        return df
-
-# Function to load meal database
-def load_meal_database():
-    if os.path.exists(MEAL_DATABASE_FILE):
-        try:
-            return pd.read_excel(MEAL_DATABASE_FILE)
-        except Exception as e:
-            st.error(f"Error reading meal database: {e}")
-            return pd.DataFrame(columns=["Meal", "Category"])
-    else:
-        return pd.DataFrame(columns=["Meal", "Category"])
+    try:
+        return STORAGE.read_meal_log()
+    except Exception as e:
+        st.warning(f"Error reading meal log: {e}")
+        return pd.DataFrame(columns=["Date", "Category", "Meal", "Quantity"])
+
+# Function to sync the in-memory meal index with the database
+def refresh_meal_index():
+    try:
+        MEALS.refresh(STORAGE)
+    except Exception as e:
+        st.error(f"Error reading meal database: {e}")
+        MEALS.rebuild([])
 
 # Function to save meal to database
 def save_meal_to_database(meal_name, category):
-    meal_db = load_meal_database()
-    if meal_name not in meal_db["Meal"].values:
-        new_entry = pd.DataFrame([[meal_name, category]], columns=["Meal", "Category"])
-        meal_db = pd.concat([meal_db, new_entry], ignore_index=True)
-        meal_db.to_excel(MEAL_DATABASE_FILE, index=False)
+    change = STORAGE.add_meal(meal_name, category)
+    if MEALS.apply(change, STORAGE, lambda: MEALS.add(meal_name, category)):
         add_notification(f"'{meal_name}' added to database!", "success")
         return True
     return False
 
 # Function to update meal in database
 def update_meal_in_database(old_meal_name, new_meal_name, new_category):
-    meal_db = load_meal_database()
-    if old_meal_name in meal_db["Meal"].values:
-        meal_db.loc[meal_db["Meal"] == old_meal_name, "Meal"] = new_meal_name
-        meal_db.loc[meal_db["Meal"] == new_meal_name, "Category"] = new_category
-        meal_db.to_excel(MEAL_DATABASE_FILE, index=False)
+    change = STORAGE.update_meal(old_meal_name, new_meal_name, new_category)
+    if MEALS.apply(change, STORAGE, lambda: MEALS.update(old_meal_name, new_meal_name, new_category)):
         add_notification(f"Meal '{old_meal_name}' updated to '{new_meal_name}'!", "success")
         return True
     return False
 
 # Function to delete meal from database
 def delete_meal_from_database(meal_name):
-    meal_db = load_meal_database()
-    if meal_name in meal_db["Meal"].values:
-        meal_db = meal_db[meal_db["Meal"] != meal_name]
-        meal_db.to_excel(MEAL_DATABASE_FILE, index=False)
+    change = STORAGE.delete_meal(meal_name)
+    if MEALS.apply(change, STORAGE, lambda: MEALS.remove(meal_name)):
         add_notification(f"'{meal_name}' deleted from database!", "success")
         return True
     return False
@@ -369,9 +338,8 @@ def delete_meal_from_database(meal_name):
 # Initialize database before rendering
 initialize_database_with_api()
 
-# Load data
+# Load data (the meal index was refreshed by initialize_database_with_api)
 meal_log = load_meal_log()
-meal_db = load_meal_database()
 notifications = load_notifications()
 
 # Title
@@ -418,10 +386,6 @@ else:
 # Meal logging section
 st.header("Log Your Meal")
 
-# Get list of meals for autocomplete
-meal_options = meal_db["Meal"].tolist() if not meal_db.empty else []
-meal_categories = dict(zip(meal_db["Meal"], meal_db["Category"])) if not meal_db.empty else {}
-
 col1, col2 = st.columns(2)
 
 with col1:
@@ -433,12 +397,12 @@ with col1:
     
     # Show suggestions if there's input
     if meal_input and meal_input != st.session_state.selected_meal:
-        matches = find_fuzzy_matches(meal_input, meal_options)
+        matches = find_fuzzy_matches(meal_input, MEALS.names())
         
         if matches:
             st.markdown("**Suggestions:**")
             for match in matches:
-                category = meal_categories.get(match, "Unknown")
+                category = MEALS.category(match, "Unknown")
                 # Create clickable suggestion
                 suggestion_html = f"""
                 <div class="suggestion-box" onclick="
@@ -468,7 +432,7 @@ with col1:
 meal = st.session_state.selected_meal if st.session_state.selected_meal else meal_input
 
 # Check if meal exists in database
-meal_exists_in_db = meal in meal_options if meal else False
+meal_exists_in_db = meal in MEALS if meal else False
 
 if meal and not meal_exists_in_db:
     st.warning(f"'{meal}' is not in your meal database.")
@@ -491,9 +455,9 @@ if save_meal_btn:
     else:
         date = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
         try:
+            STORAGE.append_meal_log(date, category, meal, quantity)
             new_entry = pd.DataFrame([[date, category, meal, quantity]], columns=["Date", "Category", "Meal", "Quantity"])
             meal_log = pd.concat([meal_log, new_entry], ignore_index=True)
-            meal_log.to_excel(MEAL_LOG_FILE, index=False)
             st.success("✅ Meal saved successfully!")
             add_notification(f"Meal saved: {meal} ({quantity} servings)", "success")
             
@@ -618,27 +582,26 @@ with col1:
         st.rerun()
 
 # Show database content
-if meal_db.empty:
+if len(MEALS) == 0:
     st.warning("No meals in the database. The API may have failed to provide data or there was an issue with initialization.")
     if st.button("🔄 Try Initialize Database Again"):
         # Force re-initialization
-        if os.path.exists(MEAL_DATABASE_FILE):
-            os.remove(MEAL_DATABASE_FILE)
+        STORAGE.reset_meal_database()
         add_notification("Attempting to reinitialize database...", "info")
         st.rerun()
 else:
-    st.success(f"📊 Database contains {len(meal_db)} meals")
+    st.success(f"📊 Database contains {len(MEALS)} meals")
     
     # Display database with styled items and icon buttons
     st.markdown("### Manage Database Items")
     
-    for idx, row in meal_db.iterrows():
+    for idx, record in enumerate(list(MEALS)):
         # Create styled meal item
         meal_item_html = f"""
         <div class="meal-item">
             <div class="meal-info">
-                <p class="meal-name">{row['Meal']}</p>
-                <p class="meal-category">{row['Category']}</p>
+                <p class="meal-name">{record.name}</p>
+                <p class="meal-category">{record.category}</p>
             </div>
         </div>
         """
@@ -651,17 +614,17 @@ else:
         with col2:
             if st.button("✏️", key=f"edit_{idx}", help="Edit meal"):
                 st.session_state.show_edit_popup = True
-                st.session_state.meal_to_edit = {"meal": row["Meal"], "category": row["Category"]}
+                st.session_state.meal_to_edit = {"meal": record.name, "category": record.category}
                 st.rerun()
         
         with col3:
             if st.button("🗑️", key=f"delete_{idx}", help="Delete meal"):
-                if delete_meal_from_database(row["Meal"]):
-                    st.success(f"✅ '{row['Meal']}' deleted successfully!")
+                if delete_meal_from_database(record.name):
+                    st.success(f"✅ '{record.name}' deleted successfully!")
                     st.rerun()
                 else:
                     st.error("❌ Failed to delete meal.")
-                    add_notification(f"Failed to delete meal '{row['Meal']}'", "error")
+                    add_notification(f"Failed to delete meal '{record.name}'", "error")
 
 # Display recent meal logs
 st.header("📝 Recent Meal Logs")
@@ -672,13 +635,50 @@ if not meal_log.empty:
 else:
     st.info("📝 No meal logs recorded yet.")
 
+# Export meal log reports (generated in the background, streamed from storage)
+st.header("📤 Export Meal Log")
+today = datetime.now().date()
+col1, col2 = st.columns(2)
+with col1:
+    report_period = st.date_input("Period", value=(today.replace(day=1), today), key="report_period")
+with col2:
+    report_format = st.selectbox("Format", reports.REPORT_FORMATS, key="report_format")
+
+if st.button("📄 Generate Report", key="generate_report"):
+    if isinstance(report_period, (list, tuple)) and len(report_period) == 2:
+        report_start = report_period[0].strftime("%Y-%m-%d")
+        report_end = (report_period[1] + timedelta(days=1)).strftime("%Y-%m-%d")
+        job = reports.submit_report(STORAGE, report_format, report_start, report_end)
+        st.session_state.report_job_id = job.id
+        add_notification(f"Report export started ({report_format}, {report_start} to {report_period[1]})", "info")
+    else:
+        st.error("Please select a start and end date.")
+
+report_job = reports.get_job(st.session_state.report_job_id) if st.session_state.report_job_id else None
+if report_job:
+    if report_job.status == "done":
+        st.success(f"✅ Report ready: {report_job.rows_written} meals")
+        with open(report_job.path, "rb") as report_file:
+            st.download_button("⬇️ Download Report", report_file, file_name=report_job.file_name, key="download_report")
+    elif report_job.status == "failed":
+        st.error(f"❌ Report failed: {report_job.error}")
+    else:
+        st.info(f"⏳ Report {report_job.status}... {report_job.rows_written} meals written so far.")
+        if st.button("🔄 Refresh Report Status", key="refresh_report"):
+            st.rerun()
+
 # Debug information
 with st.expander("🔧 Debug Information"):
-    st.write(f"Meal database file exists: {os.path.exists(MEAL_DATABASE_FILE)}")
-    st.write(f"Meal log file exists: {os.path.exists(MEAL_LOG_FILE)}")
-    st.write(f"Notifications file exists: {os.path.exists(NOTIFICATIONS_FILE)}")
-    if os.path.exists(MEAL_DATABASE_FILE):
-        st.write(f"Database file size: {os.path.getsize(MEAL_DATABASE_FILE)} bytes")
-    st.write(f"Current meal database shape: {meal_db.shape}")
+    storage_info = STORAGE.describe()
+    st.write(f"Storage backend: {type(STORAGE).__name__}")
+    st.write(f"Meal database file exists: {storage_info['meal_database']['exists']}")
+    st.write(f"Meal log file exists: {storage_info['meal_log']['exists']}")
+    st.write(f"Notifications file exists: {storage_info['notifications']['exists']}")
+    if storage_info["meal_database"]["exists"]:
+        st.write(f"Database file size: {storage_info['meal_database']['size']} bytes")
+    st.write(f"Archived meal log: {storage_info['archive']['months']} months, {storage_info['archive']['size']} bytes")
+    st.write(f"Current meal database shape: {(len(MEALS), 2)}")
     st.write(f"Current meal log shape: {meal_log.shape}")
-    st.write(f"Current notifications shape: {notifications.shape}")
\ No newline at end of file
+    st.write(f"Current notifications shape: {notifications.shape}")
+    st.write("FoodData Central API metrics:")
+    st.json(api.CLIENT.metrics())
\ No newline at end of file
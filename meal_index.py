@@ -0,0 +1,132 @@
+import sys
+import threading
+
+
+# Compact record for a single meal in the database
+class MealRecord:
+    __slots__ = ("name", "category")
+
+    def __init__(self, name, category):
+        self.name = name
+        self.category = category
+
+
+# Process-wide meal registry: name -> MealRecord hash index.
+# Dicts keep insertion order, so the index doubles as the ordered meal list.
+# Every Streamlit session thread reads it, so writers never change the
+# published dict: they build a new one and swap it in (copy-on-write).
+class MealIndex:
+    def __init__(self):
+        self._records = {}
+        self._stamp = None
+        self._lock = threading.RLock()
+
+    def __contains__(self, name):
+        return name in self._records
+
+    def __len__(self):
+        return len(self._records)
+
+    def __iter__(self):
+        return iter(self._records.values())
+
+    # Meal names in database order (used for fuzzy matching)
+    def names(self):
+        return self._records.keys()
+
+    def category(self, name, default=None):
+        record = self._records.get(name)
+        return record.category if record is not None else default
+
+    @staticmethod
+    def _build(rows):
+        records = {}
+        for name, category in rows:
+            if name is None:
+                continue
+            name = sys.intern(str(name))
+            category = sys.intern(str(category)) if category is not None else ""
+            record = records.get(name)
+            if record is None:
+                records[name] = MealRecord(name, category)
+            else:
+                # Same as dict(zip(...)): the last row wins
+                record.category = category
+        return records
+
+    # Replace the whole index with (name, category) rows
+    def rebuild(self, rows, stamp=None):
+        records = self._build(rows)
+        with self._lock:
+            self._records = records
+            self._stamp = stamp
+
+    def add(self, name, category):
+        with self._lock:
+            if name in self._records:
+                return False
+            records = dict(self._records)
+            records[sys.intern(name)] = MealRecord(sys.intern(name), sys.intern(category))
+            self._records = records
+            return True
+
+    def update(self, old_name, new_name, new_category):
+        with self._lock:
+            if old_name not in self._records:
+                return False
+            # Rebuild to keep the renamed meal in its original position
+            records = {}
+            for name, record in self._records.items():
+                if name == old_name:
+                    name = sys.intern(new_name)
+                    record = MealRecord(name, sys.intern(new_category))
+                elif name == new_name:
+                    continue
+                records[name] = record
+            self._records = records
+            return True
+
+    def remove(self, name):
+        with self._lock:
+            if name not in self._records:
+                return False
+            records = dict(self._records)
+            del records[name]
+            self._records = records
+            return True
+
+    # Reload from storage unless the meal database is unchanged since the last load.
+    # Storage may be a network round trip, so it is read without the lock; the
+    # lock only guards the swap, which is skipped if another writer published
+    # in the meantime (the next refresh compares stamps again).
+    def refresh(self, storage):
+        seen = self._stamp
+        stamp = storage.meal_database_stamp()
+        if stamp is not None and stamp == seen:
+            return False
+        rows, stamp = storage.meal_rows()
+        records = self._build(rows)
+        with self._lock:
+            if self._stamp == seen:
+                self._records = records
+                self._stamp = stamp
+        return True
+
+    # Apply a storage mutation result in place. A mutation returns
+    # (stamp before, stamp after); if the index was not current before it,
+    # another writer got in between and the index is reloaded instead.
+    def apply(self, change, storage, update):
+        if change is None:
+            return False
+        before, after = change
+        with self._lock:
+            if before == self._stamp:
+                update()
+                self._stamp = after
+                return True
+            self._stamp = None
+        self.refresh(storage)
+        return True
+
+
+MEALS = MealIndex()
@@ -0,0 +1,155 @@
+import csv
+import itertools
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+import openpyxl
+
+from storage import DATA_DIR, MEAL_LOG_COLUMNS
+
+REPORT_FORMATS = ["csv", "xlsx"]
+REPORTS_DIR = os.path.join(DATA_DIR, "reports")
+# Finished jobs and their files are removed this long after they finish
+REPORT_TTL_SECONDS = 3600
+
+# Background workers shared by all sessions in this process
+_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="report")
+_jobs = {}
+_jobs_lock = threading.Lock()
+_job_ids = itertools.count(1)
+
+
+# State of a single report export, updated by the worker thread
+class ReportJob:
+    def __init__(self, job_id, report_format, start, end, path):
+        self.id = job_id
+        self.format = report_format
+        self.start = start
+        self.end = end
+        self.path = path
+        self.status = "queued"  # queued -> running -> done | failed
+        self.rows_written = 0
+        self.error = None
+        self.created_at = time.time()
+        self.finished_at = None
+
+    @property
+    def done(self):
+        return self.status in ("done", "failed")
+
+    @property
+    def file_name(self):
+        return os.path.basename(self.path)
+
+
+# Write rows to CSV as they arrive
+def write_csv(rows, path, progress=None):
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(MEAL_LOG_COLUMNS)
+        for count, row in enumerate(rows, 1):
+            writer.writerow([row[column] for column in MEAL_LOG_COLUMNS])
+            if progress:
+                progress(count)
+
+
+# Write rows to xlsx in openpyxl write-only mode (rows are not kept in memory)
+def write_xlsx(rows, path, progress=None):
+    workbook = openpyxl.Workbook(write_only=True)
+    sheet = workbook.create_sheet("Meal Log")
+    sheet.append(MEAL_LOG_COLUMNS)
+    for count, row in enumerate(rows, 1):
+        sheet.append([row[column] for column in MEAL_LOG_COLUMNS])
+        if progress:
+            progress(count)
+    workbook.save(path)
+
+
+WRITERS = {"csv": write_csv, "xlsx": write_xlsx}
+
+
+# Stream the meal log between start and end (date strings, end exclusive) into a report file
+def generate_report(storage, report_format, path, start=None, end=None, progress=None):
+    if report_format not in WRITERS:
+        raise ValueError(f"Unsupported report format: {report_format}")
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = path + ".part"
+    try:
+        WRITERS[report_format](storage.iter_meal_log(start, end), tmp_path, progress)
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def _run_job(storage, job):
+    job.status = "running"
+
+    def progress(count):
+        job.rows_written = count
+
+    try:
+        generate_report(storage, job.format, job.path, job.start, job.end, progress)
+        job.status = "done"
+    except Exception as e:
+        job.error = str(e)
+        job.status = "failed"
+    finally:
+        job.finished_at = time.time()
+
+
+def _remove_file(path):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+# Forget finished jobs older than ttl_seconds and delete their files, plus any
+# report files left behind by earlier processes
+def cleanup_reports(ttl_seconds=REPORT_TTL_SECONDS, output_dir=REPORTS_DIR, now=None):
+    now = now or time.time()
+    with _jobs_lock:
+        expired = [job for job in _jobs.values()
+                   if job.done and now - job.finished_at >= ttl_seconds]
+        for job in expired:
+            del _jobs[job.id]
+        active = {job.path for job in _jobs.values()}
+    for job in expired:
+        _remove_file(job.path)
+    if os.path.isdir(output_dir):
+        for name in os.listdir(output_dir):
+            path = os.path.join(output_dir, name)
+            if path in active:
+                continue
+            try:
+                if now - os.path.getmtime(path) >= ttl_seconds:
+                    _remove_file(path)
+            except OSError:
+                pass
+    return len(expired)
+
+
+# Queue a report export on the background workers and return its job
+def submit_report(storage, report_format, start=None, end=None, output_dir=REPORTS_DIR):
+    if report_format not in WRITERS:
+        raise ValueError(f"Unsupported report format: {report_format}")
+    cleanup_reports(output_dir=output_dir)
+    job_id = next(_job_ids)
+    period = f"{start or 'start'}_{end or 'now'}"
+    stamp = datetime.now().strftime("%Y%m%d%H%M%S")
+    path = os.path.join(output_dir, f"meal_log_{period}_{stamp}_{job_id}.{report_format}")
+    job = ReportJob(job_id, report_format, start, end, path)
+    with _jobs_lock:
+        _jobs[job_id] = job
+    _executor.submit(_run_job, storage, job)
+    return job
+
+
+def get_job(job_id):
+    cleanup_reports()
+    with _jobs_lock:
+        return _jobs.get(job_id)
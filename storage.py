@@ -0,0 +1,335 @@
+import csv
+import glob
+import gzip
+import os
+import tempfile
+import threading
+from datetime import datetime
+
+import openpyxl
+import pandas as pd
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+MEAL_LOG_COLUMNS = ["Date", "Category", "Meal", "Quantity"]
+MEAL_DATABASE_COLUMNS = ["Meal", "Category"]
+NOTIFICATION_COLUMNS = ["Timestamp", "Type", "Message"]
+
+DATA_DIR = os.environ.get("YOURLIFE_DATA_DIR", "data")
+STORAGE_URL = os.environ.get("YOURLIFE_STORAGE_URL", "")
+# Shared secret between the storage service and its clients
+STORAGE_TOKEN = os.environ.get("YOURLIFE_STORAGE_TOKEN", "")
+
+
+# (mtime, size) of a file, used to detect changes without reading it
+def file_stamp(path):
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return (stat.st_mtime_ns, stat.st_size)
+
+
+# Flush a file's contents to disk
+def fsync_file(path):
+    with open(path, "r+b") as f:
+        os.fsync(f.fileno())
+
+
+# Flush a directory entry (a rename or removal) to disk; a no-op where
+# directories cannot be opened (Windows)
+def fsync_dir(directory):
+    try:
+        fd = os.open(directory or ".", os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+# Write a DataFrame to xlsx via a temp file so readers never see a partial
+# file, and a crash leaves either the old or the new file on disk
+def write_excel_atomic(df, path):
+    directory = os.path.dirname(path) or "."
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(suffix=".xlsx", dir=directory)
+    os.close(fd)
+    try:
+        df.to_excel(tmp_path, index=False)
+        fsync_file(tmp_path)
+        os.replace(tmp_path, path)
+    except Exception:
+        os.remove(tmp_path)
+        raise
+    fsync_dir(directory)
+
+
+# Stream the rows of an open read-only workbook's sheet as dicts
+def iter_workbook_rows(workbook, columns):
+    rows = workbook.active.iter_rows(values_only=True)
+    header = next(rows, None)
+    if not header:
+        return
+    positions = [list(header).index(column) for column in columns]
+    for row in rows:
+        if row and any(value is not None for value in row):
+            yield {column: row[pos] for column, pos in zip(columns, positions)}
+
+
+# Stream the rows of an xlsx sheet as dicts without building a DataFrame
+def iter_excel_rows(path, columns):
+    workbook = openpyxl.load_workbook(path, read_only=True)
+    try:
+        yield from iter_workbook_rows(workbook, columns)
+    finally:
+        workbook.close()
+
+
+# Meal log dates are stored as "YYYY-MM-DD HH:MM:SS" strings, but Excel may hand back datetimes
+def format_log_date(value):
+    if isinstance(value, datetime):
+        return value.strftime("%Y-%m-%d %H:%M:%S")
+    return str(value) if value is not None else ""
+
+
+# Reentrant lock held across threads *and* processes: a thread lock plus an
+# exclusive OS lock on a file in the data directory. Lets the app, the storage
+# service and compaction jobs share one data directory safely.
+class DataDirLock:
+    def __init__(self, path):
+        self.path = path
+        self._thread_lock = threading.RLock()
+        self._depth = 0
+        self._file = None
+
+    def __enter__(self):
+        self._thread_lock.acquire()
+        if self._depth == 0:
+            try:
+                os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+                self._file = open(self.path, "a+b")
+                if fcntl is not None:
+                    fcntl.flock(self._file.fileno(), fcntl.LOCK_EX)
+                else:
+                    self._file.seek(0)
+                    msvcrt.locking(self._file.fileno(), msvcrt.LK_LOCK, 1)
+            except Exception:
+                if self._file is not None:
+                    self._file.close()
+                    self._file = None
+                self._thread_lock.release()
+                raise
+        self._depth += 1
+        return self
+
+    def __exit__(self, *exc_info):
+        self._depth -= 1
+        if self._depth == 0:
+            try:
+                if fcntl is not None:
+                    fcntl.flock(self._file.fileno(), fcntl.LOCK_UN)
+                else:
+                    self._file.seek(0)
+                    msvcrt.locking(self._file.fileno(), msvcrt.LK_UNLCK, 1)
+            finally:
+                self._file.close()
+                self._file = None
+        self._thread_lock.release()
+
+
+# File-backed storage for the meal log, meal database and notifications.
+# All writes go through one lock so concurrent sessions, service requests
+# and compaction runs (in this or another process) cannot interleave
+# read-modify-write cycles.
+class LocalStorage:
+    def __init__(self, data_dir=DATA_DIR):
+        self.data_dir = data_dir
+        self.meal_log_file = os.path.join(data_dir, "meal_log.xlsx")
+        self.meal_database_file = os.path.join(data_dir, "meal_database.xlsx")
+        self.notifications_file = os.path.join(data_dir, "notifications.xlsx")
+        self.archive_dir = os.path.join(data_dir, "archive")
+        self.lock = DataDirLock(os.path.join(data_dir, ".lock"))
+
+    def _read_or_create(self, path, columns):
+        with self.lock:
+            if not os.path.exists(path):
+                df = pd.DataFrame(columns=columns)
+                write_excel_atomic(df, path)
+                return df
+        return pd.read_excel(path)
+
+    def _append(self, path, columns, row):
+        with self.lock:
+            df = self._read_or_create(path, columns)
+            new_entry = pd.DataFrame([row], columns=columns)
+            df = pd.concat([df, new_entry], ignore_index=True) if not df.empty else new_entry
+            write_excel_atomic(df, path)
+
+    # Meal log
+    def read_meal_log(self):
+        return self._read_or_create(self.meal_log_file, MEAL_LOG_COLUMNS)
+
+    # Path of the compressed archive partition holding one month ("YYYY-MM") of the meal log
+    def archive_partition(self, month):
+        return os.path.join(self.archive_dir, f"meal_log-{month}.csv.gz")
+
+    # Archived months in order, see compaction.archive_meal_log
+    def archived_months(self):
+        paths = glob.glob(os.path.join(self.archive_dir, "meal_log-*.csv.gz"))
+        return sorted(os.path.basename(path)[len("meal_log-"):-len(".csv.gz")] for path in paths)
+
+    def _iter_partition(self, f, start=None, end=None):
+        for row in csv.DictReader(f):
+            if row.get("Date") == "Date":
+                continue  # header of an appended gzip member
+            if (start and row["Date"] < start) or (end and row["Date"] >= end):
+                continue
+            try:
+                row["Quantity"] = float(row["Quantity"])
+            except (TypeError, ValueError):
+                pass
+            yield row
+
+    # Stream meal log rows (dicts) with start <= Date < end; bounds are date strings.
+    # Archived partitions come first, then the hot meal log file.
+    def iter_meal_log(self, start=None, end=None):
+        # Open every file under the lock: writers only ever replace files, so
+        # the open handles read one consistent snapshot even if compaction
+        # moves rows between the hot file and the partitions meanwhile
+        partitions, workbook = [], None
+        try:
+            with self.lock:
+                for month in self.archived_months():
+                    # Skip whole partitions outside the range
+                    if (start and month < start[:7]) or (end and month > end[:7]):
+                        continue
+                    partitions.append(gzip.open(self.archive_partition(month), "rt", newline="", encoding="utf-8"))
+                if os.path.exists(self.meal_log_file):
+                    workbook = openpyxl.load_workbook(self.meal_log_file, read_only=True)
+            for f in partitions:
+                yield from self._iter_partition(f, start, end)
+            if workbook is None:
+                return
+            for row in iter_workbook_rows(workbook, MEAL_LOG_COLUMNS):
+                row["Date"] = format_log_date(row["Date"])
+                if (start and row["Date"] < start) or (end and row["Date"] >= end):
+                    continue
+                yield row
+        finally:
+            for f in partitions:
+                f.close()
+            if workbook is not None:
+                workbook.close()
+
+    def append_meal_log(self, date, category, meal, quantity):
+        self._append(self.meal_log_file, MEAL_LOG_COLUMNS, [date, category, meal, quantity])
+
+    # Meal database
+    def read_meal_database(self):
+        if not os.path.exists(self.meal_database_file):
+            return pd.DataFrame(columns=MEAL_DATABASE_COLUMNS)
+        return pd.read_excel(self.meal_database_file)
+
+    def meal_database_exists(self):
+        return os.path.exists(self.meal_database_file)
+
+    def meal_database_stamp(self):
+        return file_stamp(self.meal_database_file)
+
+    # (Meal, Category) rows plus the stamp they were read at
+    def meal_rows(self):
+        with self.lock:
+            stamp = self.meal_database_stamp()
+            if stamp is None:
+                return [], None
+            rows = [(row["Meal"], row["Category"])
+                    for row in iter_excel_rows(self.meal_database_file, MEAL_DATABASE_COLUMNS)]
+            return rows, stamp
+
+    def write_meal_database(self, rows):
+        with self.lock:
+            df = pd.DataFrame(rows, columns=MEAL_DATABASE_COLUMNS)
+            write_excel_atomic(df, self.meal_database_file)
+
+    def reset_meal_database(self):
+        with self.lock:
+            if os.path.exists(self.meal_database_file):
+                os.remove(self.meal_database_file)
+
+    # Mutations return (stamp before, stamp after) when applied, None otherwise
+    def _change_meal_database(self, change):
+        with self.lock:
+            before = self.meal_database_stamp()
+            meal_db = self.read_meal_database()
+            meal_db = change(meal_db)
+            if meal_db is None:
+                return None
+            write_excel_atomic(meal_db, self.meal_database_file)
+            return before, self.meal_database_stamp()
+
+    def add_meal(self, meal_name, category):
+        def change(meal_db):
+            if meal_name in meal_db["Meal"].values:
+                return None
+            new_entry = pd.DataFrame([[meal_name, category]], columns=MEAL_DATABASE_COLUMNS)
+            return pd.concat([meal_db, new_entry], ignore_index=True) if not meal_db.empty else new_entry
+        return self._change_meal_database(change)
+
+    def update_meal(self, old_meal_name, new_meal_name, new_category):
+        def change(meal_db):
+            if old_meal_name not in meal_db["Meal"].values:
+                return None
+            meal_db.loc[meal_db["Meal"] == old_meal_name, "Meal"] = new_meal_name
+            meal_db.loc[meal_db["Meal"] == new_meal_name, "Category"] = new_category
+            return meal_db
+        return self._change_meal_database(change)
+
+    def delete_meal(self, meal_name):
+        def change(meal_db):
+            if meal_name not in meal_db["Meal"].values:
+                return None
+            return meal_db[meal_db["Meal"] != meal_name]
+        return self._change_meal_database(change)
+
+    # Notifications
+    def read_notifications(self):
+        return self._read_or_create(self.notifications_file, NOTIFICATION_COLUMNS)
+
+    def add_notification(self, timestamp, notification_type, message):
+        self._append(self.notifications_file, NOTIFICATION_COLUMNS, [timestamp, notification_type, message])
+
+    # File details for the debug panel
+    def describe(self):
+        info = {}
+        for name, path in [("meal_database", self.meal_database_file),
+                           ("meal_log", self.meal_log_file),
+                           ("notifications", self.notifications_file)]:
+            exists = os.path.exists(path)
+            info[name] = {"path": path, "exists": exists,
+                          "size": os.path.getsize(path) if exists else 0}
+        months = self.archived_months()
+        info["archive"] = {"path": self.archive_dir, "months": len(months),
+                           "size": sum(os.path.getsize(self.archive_partition(month)) for month in months)}
+        return info
+
+
+_storage = None
+
+
+# Process-wide storage backend: the shared storage service when
+# YOURLIFE_STORAGE_URL is set, the local data directory otherwise
+def get_storage():
+    global _storage
+    if _storage is None:
+        if STORAGE_URL:
+            from storage_client import StorageClient
+            _storage = StorageClient(STORAGE_URL)
+        else:
+            _storage = LocalStorage(DATA_DIR)
+    return _storage
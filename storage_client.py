@@ -0,0 +1,211 @@
+import http.client
+import json
+import queue
+import select
+from urllib.parse import urlencode, urlsplit
+
+import pandas as pd
+
+from storage import STORAGE_TOKEN
+
+
+class StorageError(Exception):
+    pass
+
+
+def _stamp(value):
+    return tuple(value) if value is not None else None
+
+
+def _change(value):
+    return (_stamp(value[0]), _stamp(value[1])) if value is not None else None
+
+
+def _frame(payload):
+    return pd.DataFrame(payload["data"], columns=payload["columns"])
+
+
+# An idle keep-alive socket has nothing to read; if it is readable the server
+# has closed it (or sent something unexpected), so it must not be reused
+def _is_alive(conn):
+    if conn.sock is None:
+        return False
+    try:
+        readable, _, _ = select.select([conn.sock], [], [], 0)
+    except (OSError, ValueError):
+        return False
+    return not readable
+
+
+# Client for storage_service.py with the same interface as LocalStorage.
+# Keep-alive connections are pooled and reused across requests and sessions.
+class StorageClient:
+    def __init__(self, url, pool_size=8, timeout=10, token=STORAGE_TOKEN):
+        parsed = urlsplit(url)
+        self.url = url
+        self.token = token
+        self.host = parsed.hostname or "127.0.0.1"
+        self.port = parsed.port or 80
+        self.timeout = timeout
+        self._pool = queue.LifoQueue(maxsize=pool_size)
+
+    def _acquire(self):
+        while True:
+            try:
+                conn = self._pool.get_nowait()
+            except queue.Empty:
+                return http.client.HTTPConnection(self.host, self.port, timeout=self.timeout), False
+            if _is_alive(conn):
+                return conn, True
+            conn.close()
+
+    def _release(self, conn):
+        try:
+            self._pool.put_nowait(conn)
+        except queue.Full:
+            conn.close()
+
+    def close(self):
+        while True:
+            try:
+                self._pool.get_nowait().close()
+            except queue.Empty:
+                return
+
+    # Send a request and return (connection, response) with the body still unread.
+    # On a pooled connection the server has since closed, a failure while
+    # sending means the request was never processed, so it is retried. Once
+    # the request is out only a GET is retried: the server may have applied
+    # a POST/PATCH/DELETE before closing, and resending would run it twice.
+    def _open(self, method, path, payload=None):
+        body = json.dumps(payload).encode("utf-8") if payload is not None else None
+        headers = {"Content-Type": "application/json"} if body is not None else {}
+        if self.token:
+            headers["X-Storage-Token"] = self.token
+        while True:
+            conn, reused = self._acquire()
+            try:
+                conn.request(method, path, body=body, headers=headers)
+            except (BrokenPipeError, ConnectionResetError) as e:
+                conn.close()
+                if reused:
+                    continue
+                raise StorageError(f"Storage service unavailable at {self.url}: {e}") from e
+            except (http.client.HTTPException, OSError) as e:
+                conn.close()
+                raise StorageError(f"Storage service unavailable at {self.url}: {e}") from e
+            try:
+                return conn, conn.getresponse()
+            except (http.client.RemoteDisconnected, ConnectionResetError) as e:
+                conn.close()
+                if reused and method == "GET":
+                    continue
+                if method == "GET":
+                    raise StorageError(f"Storage service unavailable at {self.url}: {e}") from e
+                raise StorageError(f"{method} {path} failed, the request may have been applied: {e}") from e
+            except (http.client.HTTPException, OSError) as e:
+                conn.close()
+                raise StorageError(f"{method} {path} failed, the request may have been applied: {e}") from e
+
+    # Return a fully read connection to the pool
+    def _finish(self, conn, response):
+        if response.will_close:
+            conn.close()
+        else:
+            self._release(conn)
+
+    def _request(self, method, path, payload=None):
+        conn, response = self._open(method, path, payload)
+        try:
+            data = response.read()
+        except (http.client.HTTPException, OSError) as e:
+            conn.close()
+            raise StorageError(f"Storage service unavailable at {self.url}: {e}") from e
+        self._finish(conn, response)
+        result = json.loads(data) if data else None
+        if response.status >= 400:
+            message = result.get("error") if isinstance(result, dict) else data
+            raise StorageError(f"{method} {path} failed ({response.status}): {message}")
+        return result
+
+    # Iterate over an NDJSON streaming endpoint without buffering the whole body
+    def _stream(self, path):
+        conn, response = self._open("GET", path)
+        if response.status >= 400:
+            data = response.read()
+            self._finish(conn, response)
+            raise StorageError(f"GET {path} failed ({response.status}): {data}")
+        finished = False
+        try:
+            for line in response:
+                item = json.loads(line)
+                if isinstance(item, dict) and set(item) == {"error"}:
+                    raise StorageError(f"GET {path} failed: {item['error']}")
+                yield item
+            finished = True
+        finally:
+            # A partially read response cannot be reused
+            if finished:
+                self._finish(conn, response)
+            else:
+                conn.close()
+
+    def health(self):
+        return self._request("GET", "/health")
+
+    def describe(self):
+        return self._request("GET", "/describe")
+
+    # Meal log
+    def read_meal_log(self):
+        return _frame(self._request("GET", "/meal-log"))
+
+    def iter_meal_log(self, start=None, end=None):
+        query = urlencode({key: value for key, value in [("start", start), ("end", end)] if value})
+        return self._stream("/meal-log/rows" + (f"?{query}" if query else ""))
+
+    def append_meal_log(self, date, category, meal, quantity):
+        self._request("POST", "/meal-log",
+                      {"date": date, "category": category, "meal": meal, "quantity": quantity})
+
+    # Meal database
+    def read_meal_database(self):
+        return _frame(self._request("GET", "/meals/table"))
+
+    def meal_database_exists(self):
+        return self._request("GET", "/meals/exists")
+
+    def meal_database_stamp(self):
+        return _stamp(self._request("GET", "/meals/stamp"))
+
+    def meal_rows(self):
+        result = self._request("GET", "/meals")
+        return [tuple(row) for row in result["rows"]], _stamp(result["stamp"])
+
+    def write_meal_database(self, rows):
+        self._request("PUT", "/meals", {"rows": [list(row) for row in rows]})
+
+    def reset_meal_database(self):
+        self._request("DELETE", "/meals/all")
+
+    def add_meal(self, meal_name, category):
+        return _change(self._request("POST", "/meals", {"meal": meal_name, "category": category}))
+
+    def update_meal(self, old_meal_name, new_meal_name, new_category):
+        return _change(self._request("PATCH", "/meals", {
+            "old_meal": old_meal_name, "new_meal": new_meal_name, "category": new_category}))
+
+    def delete_meal(self, meal_name):
+        return _change(self._request("DELETE", "/meals", {"meal": meal_name}))
+
+    # Notifications
+    def read_notifications(self):
+        return _frame(self._request("GET", "/notifications"))
+
+    def add_notification(self, timestamp, notification_type, message):
+        self._request("POST", "/notifications",
+                      {"timestamp": timestamp, "type": notification_type, "message": message})
+
+    # Maintenance, see compaction.compact
+    def compact(self, **options):
+        return self._request("POST", "/admin/compact", options)
@@ -0,0 +1,231 @@
+import argparse
+import hmac
+import ipaddress
+import json
+import threading
+import types
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+import compaction
+from storage import DATA_DIR, STORAGE_TOKEN, LocalStorage
+
+
+# DataFrame -> {"columns": [...], "data": [[...], ...]} with NaN as null
+def frame_to_json(df):
+    return json.loads(df.to_json(orient="split", index=False, date_format="iso"))
+
+
+def stamp_to_json(stamp):
+    return list(stamp) if stamp is not None else None
+
+
+def change_to_json(change):
+    if change is None:
+        return None
+    return [stamp_to_json(change[0]), stamp_to_json(change[1])]
+
+
+# JSON-over-HTTP API around a LocalStorage, so several UI processes can
+# share one set of data files. Requests are served on threads; the
+# storage lock serializes the writes.
+class StorageRequestHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive for pooled client connections
+    server_version = "YourLifeStorage/1.0"
+
+    @property
+    def storage(self):
+        return self.server.storage
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+    def _read_json(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        if not length:
+            return {}
+        return json.loads(self.rfile.read(length))
+
+    def _send_json(self, status, payload):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    # Send a generator of JSON-serializable items as chunked NDJSON
+    def _send_stream(self, items, batch_size=500):
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+
+        def write_chunk(lines):
+            data = "".join(lines).encode("utf-8")
+            self.wfile.write(f"{len(data):X}\r\n".encode("ascii") + data + b"\r\n")
+
+        lines = []
+        try:
+            try:
+                for item in items:
+                    lines.append(json.dumps(item) + "\n")
+                    if len(lines) >= batch_size:
+                        write_chunk(lines)
+                        lines = []
+            except (BrokenPipeError, ConnectionResetError):
+                raise
+            except Exception as e:
+                # Headers are already sent, so report the failure in-band
+                lines.append(json.dumps({"error": str(e)}) + "\n")
+            if lines:
+                write_chunk(lines)
+            self.wfile.write(b"0\r\n\r\n")
+        except (BrokenPipeError, ConnectionResetError):
+            # The client stopped reading early
+            self.close_connection = True
+        finally:
+            items.close()
+
+    def _authorized(self):
+        if not self.server.token:
+            return True
+        return hmac.compare_digest(self.headers.get("X-Storage-Token", ""), self.server.token)
+
+    def _dispatch(self, method):
+        if not self._authorized():
+            self.close_connection = True  # the request body is left unread
+            self._send_json(401, {"error": "Missing or invalid X-Storage-Token"})
+            return
+        url = urlsplit(self.path)
+        route = self.server.routes.get((method, url.path))
+        if route is None:
+            self._send_json(404, {"error": f"No route for {method} {url.path}"})
+            return
+        try:
+            payload = self._read_json()
+            payload.update({key: values[-1] for key, values in parse_qs(url.query).items()})
+            result = route(self.storage, payload)
+        except (KeyError, ValueError) as e:
+            self._send_json(400, {"error": f"Bad request: {e}"})
+        except Exception as e:
+            self._send_json(500, {"error": str(e)})
+        else:
+            if isinstance(result, types.GeneratorType):
+                self._send_stream(result)
+            else:
+                self._send_json(200, result)
+
+    def do_GET(self):
+        self._dispatch("GET")
+
+    def do_POST(self):
+        self._dispatch("POST")
+
+    def do_PUT(self):
+        self._dispatch("PUT")
+
+    def do_PATCH(self):
+        self._dispatch("PATCH")
+
+    def do_DELETE(self):
+        self._dispatch("DELETE")
+
+
+def _meal_rows(storage, payload):
+    rows, stamp = storage.meal_rows()
+    return {"rows": [list(row) for row in rows], "stamp": stamp_to_json(stamp)}
+
+
+ROUTES = {
+    ("GET", "/health"): lambda storage, payload: {"status": "ok"},
+    ("GET", "/describe"): lambda storage, payload: storage.describe(),
+    # Meal log
+    ("GET", "/meal-log"): lambda storage, payload: frame_to_json(storage.read_meal_log()),
+    ("GET", "/meal-log/rows"): lambda storage, payload: storage.iter_meal_log(
+        payload.get("start"), payload.get("end")),
+    ("POST", "/meal-log"): lambda storage, payload: storage.append_meal_log(
+        payload["date"], payload["category"], payload["meal"], payload["quantity"]),
+    # Meal database
+    ("GET", "/meals"): _meal_rows,
+    ("GET", "/meals/table"): lambda storage, payload: frame_to_json(storage.read_meal_database()),
+    ("GET", "/meals/exists"): lambda storage, payload: storage.meal_database_exists(),
+    ("GET", "/meals/stamp"): lambda storage, payload: stamp_to_json(storage.meal_database_stamp()),
+    ("PUT", "/meals"): lambda storage, payload: storage.write_meal_database(payload["rows"]),
+    ("DELETE", "/meals/all"): lambda storage, payload: storage.reset_meal_database(),
+    ("POST", "/meals"): lambda storage, payload: change_to_json(
+        storage.add_meal(payload["meal"], payload["category"])),
+    ("PATCH", "/meals"): lambda storage, payload: change_to_json(
+        storage.update_meal(payload["old_meal"], payload["new_meal"], payload["category"])),
+    ("DELETE", "/meals"): lambda storage, payload: change_to_json(
+        storage.delete_meal(payload["meal"])),
+    # Notifications
+    ("GET", "/notifications"): lambda storage, payload: frame_to_json(storage.read_notifications()),
+    ("POST", "/notifications"): lambda storage, payload: storage.add_notification(
+        payload["timestamp"], payload["type"], payload["message"]),
+    # Maintenance
+    ("POST", "/admin/compact"): lambda storage, payload: compaction.compact(storage, **payload),
+}
+
+
+def is_loopback(host):
+    if host == "localhost":
+        return True
+    try:
+        return ipaddress.ip_address(host).is_loopback
+    except ValueError:
+        return False
+
+
+# Create (but do not start) a storage server; port 0 picks a free port.
+# Requests must carry the token in X-Storage-Token when one is set, and a
+# server reachable from other hosts refuses to start without one.
+def make_server(storage, host="127.0.0.1", port=8765, verbose=False, token=STORAGE_TOKEN):
+    if not token and not is_loopback(host):
+        raise ValueError(f"Refusing to serve on {host} without a token (set YOURLIFE_STORAGE_TOKEN)")
+    server = ThreadingHTTPServer((host, port), StorageRequestHandler)
+    server.daemon_threads = True
+    server.storage = storage
+    server.routes = ROUTES
+    server.verbose = verbose
+    server.token = token
+    return server
+
+
+# Run a server on a background thread (for local testing and load tests)
+def start_in_thread(storage, host="127.0.0.1", port=0, token=STORAGE_TOKEN):
+    server = make_server(storage, host, port, token=token)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server, f"http://{host}:{server.server_address[1]}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="YourLife Coach shared storage service")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--data-dir", default=DATA_DIR)
+    parser.add_argument("--compact-every", type=float,
+                        help="run notification/meal log compaction every N seconds")
+    parser.add_argument("--verbose", action="store_true")
+    args = parser.parse_args()
+
+    storage = LocalStorage(args.data_dir)
+    try:
+        server = make_server(storage, args.host, args.port, args.verbose)
+    except ValueError as e:
+        parser.error(str(e))
+    if args.compact_every:
+        compaction.start_scheduler(storage, args.compact_every)
+    print(f"Storage service for '{args.data_dir}' listening on http://{args.host}:{server.server_address[1]}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
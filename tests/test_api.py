@@ -0,0 +1,61 @@
+import time
+
+import requests
+
+import api
+from fdc_client import CircuitBreaker, FoodDataClient
+
+
+class FakeResponse:
+    def __init__(self, status_code, payload):
+        self.status_code = status_code
+        self._payload = payload
+
+    def json(self):
+        return self._payload
+
+
+class FakeSession:
+    def __init__(self, payload):
+        self.payload = payload
+
+    def get(self, url, params=None, timeout=None):
+        return FakeResponse(200, self.payload)
+
+
+# Every request hangs until its timeout
+class TimeoutSession:
+    def get(self, url, params=None, timeout=None):
+        time.sleep(timeout)
+        raise requests.Timeout("read timed out")
+
+
+def _client(session):
+    client = FoodDataClient(base_url="http://fdc.invalid", breaker=CircuitBreaker())
+    client.session = session
+    return client
+
+
+def test_malformed_foods_are_skipped(monkeypatch):
+    monkeypatch.setattr(api.time, "sleep", lambda seconds: None)
+    client = _client(FakeSession({"foods": ["oats", {"description": None}, {"description": " Oatmeal "}, {}]}))
+    notifications = []
+    assert api.fetch_api_data(["Breakfast"], notifications, client=client) == [["Oatmeal", "Breakfast"]]
+    assert notifications == ["Successfully fetched 1 items for Breakfast"]
+
+
+def test_non_dict_body_falls_back_to_placeholders(monkeypatch):
+    monkeypatch.setattr(api.time, "sleep", lambda seconds: None)
+    notifications = []
+    data = api.fetch_api_data(["Breakfast", "Lunch"], notifications, client=_client(FakeSession(["not", "a", "dict"])))
+    assert [item[1] for item in data] == ["Breakfast"] * 5 + ["Lunch"] * 5
+    assert notifications == ["Added placeholder items for Breakfast (API unavailable)",
+                             "Added placeholder items for Lunch (API unavailable)"]
+
+
+def test_fetch_stays_within_budget_when_every_call_times_out():
+    client = _client(TimeoutSession())
+    started = time.monotonic()
+    data = api.fetch_api_data(["Breakfast", "Lunch", "Dinner", "Snack"], [], budget_seconds=0.5, client=client)
+    assert time.monotonic() - started < 1.0
+    assert len(data) == 20  # placeholders for every category
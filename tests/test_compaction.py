@@ -0,0 +1,123 @@
+import multiprocessing
+import os
+from datetime import datetime
+
+import pytest
+
+import compaction
+from storage import LocalStorage
+
+
+def _append_rows(data_dir, count):
+    storage = LocalStorage(data_dir)
+    for i in range(count):
+        storage.append_meal_log(f"2026-03-01 08:{i:02d}:00", "Lunch", f"meal {i}", 1.0)
+
+
+def _seed(storage):
+    storage.append_meal_log("2026-01-05 08:00:00", "Breakfast", "Oatmeal", 1.0)
+    storage.append_meal_log("2026-02-05 08:00:00", "Lunch", "Soup", 2.0)
+    storage.append_meal_log("2026-10-05 08:00:00", "Dinner", "Fish", 1.0)
+
+
+def test_archive_moves_old_months(tmp_path):
+    storage = LocalStorage(str(tmp_path))
+    _seed(storage)
+    assert compaction.archive_meal_log(storage, now=datetime(2026, 10, 19)) == 2
+    assert storage.archived_months() == ["2026-01", "2026-02"]
+    assert len(storage.read_meal_log()) == 1
+    assert [row["Meal"] for row in storage.iter_meal_log()] == ["Oatmeal", "Soup", "Fish"]
+
+
+def test_failed_archive_leaves_data_unchanged(tmp_path, monkeypatch):
+    storage = LocalStorage(str(tmp_path))
+    _seed(storage)
+    real_rewrite = compaction._rewrite_partition
+
+    def failing_rewrite(path, keep_bytes, rows=None):
+        if "2026-02" in path and rows is not None:
+            raise OSError("disk full")
+        real_rewrite(path, keep_bytes, rows)
+
+    monkeypatch.setattr(compaction, "_rewrite_partition", failing_rewrite)
+    with pytest.raises(OSError):
+        compaction.archive_meal_log(storage, now=datetime(2026, 10, 19))
+    assert list(storage.read_meal_log()["Meal"]) == ["Oatmeal", "Soup", "Fish"]
+    assert storage.archived_months() == []
+
+    monkeypatch.setattr(compaction, "_rewrite_partition", real_rewrite)
+    assert compaction.archive_meal_log(storage, now=datetime(2026, 10, 19)) == 2
+    assert [row["Meal"] for row in storage.iter_meal_log()] == ["Oatmeal", "Soup", "Fish"]
+
+
+def _archive_and_die(data_dir, stage):
+    def die(*args, **kwargs):
+        os._exit(1)
+
+    if stage == "partition":
+        real_rewrite = compaction._rewrite_partition
+
+        def rewrite(path, keep_bytes, rows=None):
+            if "2026-02" in path:
+                die()
+            real_rewrite(path, keep_bytes, rows)
+
+        compaction._rewrite_partition = rewrite
+    elif stage == "hot_file":
+        compaction._remove_archived_rows = die
+    else:
+        compaction._clear_pending = die
+    compaction.archive_meal_log(LocalStorage(data_dir), now=datetime(2026, 10, 19))
+
+
+@pytest.mark.parametrize("stage", ["partition", "hot_file", "journal"])
+def test_archive_killed_midway_loses_and_duplicates_nothing(tmp_path, stage):
+    data_dir = str(tmp_path)
+    storage = LocalStorage(data_dir)
+    _seed(storage)
+    # An earlier run already archived part of January
+    storage.append_meal_log("2026-01-01 08:00:00", "Breakfast", "Eggs", 1.0)
+    compaction.archive_meal_log(storage, now=datetime(2026, 10, 19))
+    storage.append_meal_log("2026-01-06 08:00:00", "Breakfast", "Toast", 1.0)
+    storage.append_meal_log("2026-02-06 08:00:00", "Lunch", "Salad", 1.0)
+
+    process = multiprocessing.get_context("spawn").Process(target=_archive_and_die, args=(data_dir, stage))
+    process.start()
+    process.join()
+    assert process.exitcode == 1
+    assert os.path.exists(os.path.join(storage.archive_dir, "pending.json"))
+
+    # The next run finishes the interrupted move
+    assert compaction.archive_meal_log(storage, now=datetime(2026, 10, 19)) == 2
+    assert not os.path.exists(os.path.join(storage.archive_dir, "pending.json"))
+    assert sorted(row["Meal"] for row in storage.iter_meal_log()) == [
+        "Eggs", "Fish", "Oatmeal", "Salad", "Soup", "Toast"]
+    assert list(storage.read_meal_log()["Meal"]) == ["Fish"]
+    with open(os.path.join(storage.archive_dir, "summary.csv")) as f:
+        assert f.read().splitlines()[1:] == ["2026-01,Breakfast,3,3.0", "2026-02,Lunch,2,3.0"]
+
+
+def test_compaction_does_not_lose_rows_appended_by_another_process(tmp_path):
+    data_dir = str(tmp_path)
+    storage = LocalStorage(data_dir)
+    _seed(storage)
+    writer = multiprocessing.get_context("spawn").Process(target=_append_rows, args=(data_dir, 20))
+    writer.start()
+    # Each run archives whatever old rows the writer has added so far
+    while writer.is_alive():
+        compaction.archive_meal_log(storage, now=datetime(2026, 10, 19))
+    writer.join()
+    assert writer.exitcode == 0
+    assert sum(1 for _ in storage.iter_meal_log()) == 23
+
+
+def test_export_reads_one_snapshot_while_compaction_runs(tmp_path):
+    storage = LocalStorage(str(tmp_path))
+    _seed(storage)
+    compaction.archive_meal_log(storage, now=datetime(2026, 10, 19))
+    storage.append_meal_log("2026-03-05 08:00:00", "Lunch", "Pasta", 1.0)
+    rows = storage.iter_meal_log()
+    first = next(rows)
+    # Moves March out of the hot file after the export started reading
+    assert compaction.archive_meal_log(storage, now=datetime(2026, 10, 19)) == 1
+    assert [first["Meal"]] + [row["Meal"] for row in rows] == ["Oatmeal", "Soup", "Fish", "Pasta"]
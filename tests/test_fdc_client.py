@@ -0,0 +1,76 @@
+import time
+
+import pytest
+import requests
+
+from fdc_client import CircuitBreaker, CircuitOpenError, DeadlineExceeded, FoodDataClient, FoodDataError
+
+
+class FakeResponse:
+    def __init__(self, status_code, payload=None):
+        self.status_code = status_code
+        self._payload = payload or {}
+
+    def json(self):
+        return self._payload
+
+
+class FakeSession:
+    def __init__(self, *results):
+        self.results = list(results)
+        self.calls = 0
+
+    def get(self, url, params=None, timeout=None):
+        self.calls += 1
+        result = self.results.pop(0)
+        if isinstance(result, BaseException):
+            raise result
+        return result
+
+
+def _half_open_client(session):
+    client = FoodDataClient(base_url="http://fdc.invalid", max_retries=0,
+                            breaker=CircuitBreaker(failure_threshold=1, reset_timeout=0.05))
+    client.session = session
+    client.breaker.record_failure()
+    time.sleep(0.1)
+    assert client.breaker.state == "half_open"
+    return client
+
+
+def test_expired_deadline_does_not_take_half_open_trial():
+    session = FakeSession(FakeResponse(200, {"foods": [{"description": "OATMEAL"}]}))
+    client = _half_open_client(session)
+    with pytest.raises(DeadlineExceeded):
+        client.search_foods("oatmeal", deadline=time.monotonic() - 1)
+    assert session.calls == 0
+
+    assert client.search_foods("oatmeal", deadline=time.monotonic() + 5) == [{"description": "OATMEAL"}]
+    assert client.breaker.state == "closed"
+
+
+def test_unexpected_error_releases_half_open_trial():
+    session = FakeSession(KeyboardInterrupt(), FakeResponse(200, {"foods": []}))
+    client = _half_open_client(session)
+    with pytest.raises(KeyboardInterrupt):
+        client.search_foods("oatmeal")
+    assert client.search_foods("oatmeal") == []
+
+
+def test_failed_trial_reopens_circuit():
+    session = FakeSession(requests.ConnectionError("down"))
+    client = _half_open_client(session)
+    with pytest.raises(FoodDataError, match="failed after retries"):
+        client.search_foods("oatmeal")
+    assert client.breaker.state == "open"
+    with pytest.raises(CircuitOpenError):
+        client.search_foods("oatmeal")
+    assert session.calls == 1
+
+
+def test_search_foods_rejects_unexpected_bodies():
+    for payload in (["oatmeal"], {"foods": "oatmeal"}):
+        client = FoodDataClient(base_url="http://fdc.invalid")
+        client.session = FakeSession(FakeResponse(200, payload))
+        with pytest.raises(FoodDataError, match="Unexpected response"):
+            client.search_foods("oatmeal")
@@ -0,0 +1,62 @@
+import threading
+
+from meal_index import MealIndex
+
+
+def test_add_update_remove_keep_order():
+    index = MealIndex()
+    index.rebuild([("Oatmeal", "Breakfast"), ("Apple", "Snack"), ("Apple", "Lunch")])
+    assert list(index.names()) == ["Oatmeal", "Apple"]
+    assert index.category("Apple") == "Lunch"
+
+    assert index.add("Soup", "Dinner")
+    assert not index.add("Soup", "Lunch")
+    assert index.update("Oatmeal", "Porridge", "Breakfast")
+    assert index.remove("Apple")
+    assert not index.remove("Apple")
+    assert [(record.name, record.category) for record in index] == [("Porridge", "Breakfast"), ("Soup", "Dinner")]
+
+
+def test_writes_do_not_disturb_iteration_in_progress():
+    # A session thread may be fuzzy-matching over names() while another saves a meal
+    index = MealIndex()
+    index.rebuild([("Oatmeal", "Breakfast"), ("Apple", "Snack")])
+    names = iter(index.names())
+    assert next(names) == "Oatmeal"
+    index.add("Soup", "Dinner")
+    index.remove("Oatmeal")
+    assert list(names) == ["Apple"]
+    assert list(index.names()) == ["Apple", "Soup"]
+
+
+# Storage whose reads block until released, like a slow storage service
+class SlowStorage:
+    def __init__(self, rows, stamp):
+        self.rows = rows
+        self.stamp = stamp
+        self.reading = threading.Event()
+        self.release = threading.Event()
+
+    def meal_database_stamp(self):
+        return self.stamp
+
+    def meal_rows(self):
+        self.reading.set()
+        assert self.release.wait(5)
+        return self.rows, self.stamp
+
+
+def test_refresh_does_not_hold_the_lock_during_storage_reads():
+    index = MealIndex()
+    index.rebuild([("Oatmeal", "Breakfast")], stamp=(1, 1))
+    storage = SlowStorage([("Oatmeal", "Breakfast"), ("Soup", "Dinner")], (2, 2))
+    refresher = threading.Thread(target=index.refresh, args=(storage,))
+    refresher.start()
+    assert storage.reading.wait(5)
+    # Another session can still write while the read is in flight
+    assert index.apply(((1, 1), (3, 3)), storage, lambda: index.add("Apple", "Snack"))
+    storage.release.set()
+    refresher.join(5)
+    # The slower refresh does not overwrite the newer write
+    assert list(index.names()) == ["Oatmeal", "Apple"]
+    assert not refresher.is_alive()
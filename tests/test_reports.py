@@ -0,0 +1,31 @@
+import os
+import time
+
+import reports
+from storage import LocalStorage
+
+
+def _wait(job):
+    while not job.done:
+        time.sleep(0.05)
+
+
+def test_report_streams_rows_and_expires(tmp_path):
+    storage = LocalStorage(str(tmp_path / "data"))
+    storage.append_meal_log("2026-01-02 08:00:00", "Breakfast", "Oatmeal", 1.0)
+    storage.append_meal_log("2026-02-02 08:00:00", "Lunch", "Soup", 2.0)
+    output_dir = str(tmp_path / "reports")
+
+    job = reports.submit_report(storage, "csv", "2026-01-01", "2026-02-01", output_dir=output_dir)
+    _wait(job)
+    assert job.status == "done" and job.rows_written == 1
+    with open(job.path) as f:
+        assert f.read().splitlines() == ["Date,Category,Meal,Quantity", "2026-01-02 08:00:00,Breakfast,Oatmeal,1"]
+
+    # Still within the TTL: kept
+    assert reports.cleanup_reports(output_dir=output_dir) == 0
+    assert reports.get_job(job.id) is job
+
+    assert reports.cleanup_reports(output_dir=output_dir, now=job.finished_at + reports.REPORT_TTL_SECONDS) == 1
+    assert reports.get_job(job.id) is None
+    assert not os.path.exists(job.path)
@@ -0,0 +1,107 @@
+import time
+from urllib.parse import urlsplit
+
+import pytest
+
+import storage_service
+from storage import LocalStorage
+from storage_client import StorageClient, StorageError
+
+
+class SlowAppendStorage(LocalStorage):
+    def append_meal_log(self, *args):
+        time.sleep(1.5)
+        super().append_meal_log(*args)
+
+
+class IdleTimeoutHandler(storage_service.StorageRequestHandler):
+    timeout = 0.2
+
+
+# Applies a POST, then closes the connection instead of replying
+class DropAfterPostHandler(storage_service.StorageRequestHandler):
+    def do_POST(self):
+        route = self.server.routes[("POST", urlsplit(self.path).path)]
+        route(self.storage, self._read_json())
+        self.close_connection = True
+
+
+@pytest.fixture
+def serve(tmp_path):
+    servers = []
+
+    def start(storage_class=LocalStorage, handler=None):
+        server, url = storage_service.start_in_thread(storage_class(str(tmp_path)))
+        if handler is not None:
+            server.RequestHandlerClass = handler
+        servers.append(server)
+        return server, url
+
+    yield start
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+
+def _meal_log_rows(client):
+    return sum(1 for _ in client.iter_meal_log())
+
+
+def test_round_trip(serve):
+    _, url = serve()
+    client = StorageClient(url)
+    client.append_meal_log("2026-01-02 08:00:00", "Breakfast", "Oatmeal", 1.0)
+    assert client.add_meal("Oatmeal", "Breakfast") is not None
+    assert client.add_meal("Oatmeal", "Breakfast") is None
+    rows, stamp = client.meal_rows()
+    assert rows == [("Oatmeal", "Breakfast")] and stamp is not None
+    assert list(client.iter_meal_log()) == [
+        {"Date": "2026-01-02 08:00:00", "Category": "Breakfast", "Meal": "Oatmeal", "Quantity": 1}]
+
+
+def test_timed_out_post_is_not_resent(serve):
+    _, url = serve(SlowAppendStorage)
+    client = StorageClient(url, timeout=0.5)
+    client.health()  # the next request goes out on a reused connection
+    with pytest.raises(StorageError):
+        client.append_meal_log("2026-01-02 08:00:00", "Breakfast", "Oatmeal", 1.0)
+    time.sleep(2)
+    assert _meal_log_rows(StorageClient(url)) == 1
+
+
+def test_dropped_idle_connection_is_retried_once(serve):
+    _, url = serve(handler=IdleTimeoutHandler)
+    client = StorageClient(url)
+    client.health()
+    time.sleep(0.5)  # the server closes the pooled connection
+    client.append_meal_log("2026-01-02 08:00:00", "Breakfast", "Oatmeal", 1.0)
+    assert _meal_log_rows(client) == 1
+
+
+def test_post_applied_before_disconnect_is_not_resent(serve):
+    _, url = serve(handler=DropAfterPostHandler)
+    client = StorageClient(url)
+    client.health()
+    with pytest.raises(StorageError, match="may have been applied"):
+        client.append_meal_log("2026-01-02 08:00:00", "Breakfast", "Oatmeal", 1.0)
+    assert _meal_log_rows(client) == 1
+
+
+def test_token_is_required_when_set(tmp_path):
+    server, url = storage_service.start_in_thread(LocalStorage(str(tmp_path)), token="s3cret")
+    try:
+        with pytest.raises(StorageError, match="401"):
+            StorageClient(url, token="").append_meal_log("2026-01-02 08:00:00", "Breakfast", "Oatmeal", 1.0)
+        with pytest.raises(StorageError, match="401"):
+            StorageClient(url, token="wrong").reset_meal_database()
+        client = StorageClient(url, token="s3cret")
+        client.append_meal_log("2026-01-02 08:00:00", "Breakfast", "Oatmeal", 1.0)
+        assert _meal_log_rows(client) == 1
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def test_non_loopback_server_needs_a_token(tmp_path):
+    with pytest.raises(ValueError, match="without a token"):
+        storage_service.make_server(LocalStorage(str(tmp_path)), host="0.0.0.0", port=0, token="")